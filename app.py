@@ -1,31 +1,71 @@
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import os
 
-df = pd.read_csv("dados.csv",sep=";")
+from cache_respostas import CacheRespostas, normalizar_pergunta
+from faq import IndiceFAQ
 
-vectorizer = TfidfVectorizer()
+ARQUIVO_DADOS = "dados.csv"
+PASTA_INDICE = ".indice_faq"
 
-tfidf_matrix = vectorizer.fit_transform(df['Perguntas'])
+indice = IndiceFAQ.abrir(ARQUIVO_DADOS, PASTA_INDICE)
+cache = CacheRespostas()
+
+def indice_atual():
+    """Reabre o índice se o dados.csv foi alterado por fora do app"""
+
+    global indice
+    info = os.stat(ARQUIVO_DADOS)
+    if (info.st_mtime_ns, info.st_size) != indice.assinatura:
+        indice = IndiceFAQ.abrir(ARQUIVO_DADOS, PASTA_INDICE)
+        cache.limpar()
+    return indice
 
 def responder_perguntas(pergunta_usuario):
 
-    pergunta_vetor = vectorizer.transform([pergunta_usuario])
+    return responder_perguntas_lote([pergunta_usuario])[0][0][0]
+
+def responder_perguntas_lote(perguntas, k=1):
+    """Responde várias perguntas de uma vez; para cada uma, lista as k respostas com o score"""
+
+    atual = indice_atual()
+    chaves = [(normalizar_pergunta(p), k) for p in perguntas]
+    respostas = [cache.obter(chave, atual.versao) for chave in chaves]
+
+    # Só as perguntas fora do cache vão para o índice; variações da mesma pergunta buscam uma vez.
+    # A busca usa o texto normalizado da chave, então a resposta não depende de qual variação chegou antes
+    faltando = dict.fromkeys(chave for chave, resposta in zip(chaves, respostas) if resposta is None)
+
+    if faltando:
+        indices, scores = atual.buscar([texto for texto, _ in faltando], k)
+
+        # Sem nenhum termo em comum a resposta é a primeira do FAQ, como no argmax de antes
+        indices[:, 0][indices[:, 0] < 0] = 0
+
+        for chave, linha_indices, linha_scores in zip(faltando, indices, scores):
+            faltando[chave] = [(atual.resposta(i), float(s)) for i, s in zip(linha_indices, linha_scores) if i >= 0]
+            cache.guardar(chave, faltando[chave], atual.versao)
+        respostas = [faltando[chave] if resposta is None else resposta for chave, resposta in zip(chaves, respostas)]
+
+    return respostas
+
+def incluir_perguntas(perguntas, respostas):
+    """Inclui perguntas no FAQ (e no CSV) sem reconstruir o índice"""
 
-    similaridades = cosine_similarity(pergunta_vetor,tfidf_matrix)
+    return indice_atual().adicionar(perguntas, respostas)
 
-    indice_mais_similar = similaridades.argmax()
+def remover_perguntas(posicoes):
+    """Remove perguntas do FAQ (e do CSV) pela posição no índice"""
 
-    return df.iloc[indice_mais_similar]['Respostas']
+    indice_atual().remover(posicoes)
 
-print("Assistente Virtual- Digite 'sair' para encerrar!")
+if __name__ == "__main__":
+    print("Assistente Virtual- Digite 'sair' para encerrar!")
 
-while True:
-    pergunta = input("\n Como posso te ajudar?")
+    while True:
+        pergunta = input("\n Como posso te ajudar?")
 
-    if pergunta.lower() == 'sair':
-        print('Até Breve!')
-        break
+        if pergunta.lower() == 'sair':
+            print('Até Breve!')
+            break
 
-    resposta = responder_perguntas(pergunta)
-    print(f"\nResposta: {resposta}")
+        resposta = responder_perguntas(pergunta)
+        print(f"\nResposta: {resposta}")
@@ -0,0 +1,71 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Quantidade máxima de perguntas guardadas e por quanto tempo (segundos) cada resposta vale
+TAMANHO_CACHE = 10000
+VALIDADE_CACHE = 3600
+
+
+def normalizar_pergunta(pergunta):
+    """Forma canônica da pergunta: sem acentos, minúscula, sem pontuação e espaços repetidos"""
+    texto = unicodedata.normalize('NFKD', str(pergunta))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^\w\s]', ' ', texto).split())
+
+
+class CacheRespostas:
+    """Cache LRU com validade das respostas do FAQ, preso a uma versão do índice"""
+
+    def __init__(self, tamanho=TAMANHO_CACHE, validade=VALIDADE_CACHE):
+        self.tamanho = tamanho
+        self.validade = validade
+        self.itens = OrderedDict()
+        self.versao = None
+        self.acertos = 0
+        self.falhas = 0
+        self.trava = threading.Lock()
+
+    def _conferir_versao(self, versao):
+        # Índice mudou: nenhuma resposta guardada vale mais
+        if versao != self.versao:
+            self.itens.clear()
+            self.versao = versao
+
+    def obter(self, chave, versao):
+        """Resposta guardada para a chave ou None; conta acerto/falha"""
+        with self.trava:
+            self._conferir_versao(versao)
+            item = self.itens.get(chave)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self.itens[chave]
+                self.falhas += 1
+                return None
+            self.itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def guardar(self, chave, valor, versao):
+        """Guarda a resposta e descarta a usada há mais tempo se passar do tamanho"""
+        with self.trava:
+            self._conferir_versao(versao)
+            self.itens[chave] = (time.monotonic() + self.validade, valor)
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.tamanho:
+                self.itens.popitem(last=False)
+
+    def limpar(self):
+        with self.trava:
+            self.itens.clear()
+
+    def estatisticas(self):
+        consultas = self.acertos + self.falhas
+        return {
+            'itens': len(self.itens),
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+        }
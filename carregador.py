@@ -0,0 +1,281 @@
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.tseries.api import guess_datetime_format
+
+# Pasta onde ficam as cópias em Parquet das planilhas
+PASTA_CACHE = ".cache_dados"
+
+# Linhas da planilha convertidas e gravadas por vez; a memória da conversão acompanha este número
+LINHAS_POR_LOTE = 20000
+
+# Textos que o read_excel trata como vazio por padrão (lista "na_values" da documentação do pandas)
+TEXTOS_VAZIOS = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Calcula o sha256 do conteúdo do arquivo lendo em blocos"""
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _caminhos_cache(caminho, sheet_name, pasta_cache):
+    """Retorna os caminhos do Parquet e do manifesto de uma planilha"""
+    base = os.path.splitext(os.path.basename(caminho))[0]
+    chave = hashlib.sha1(f"{os.path.abspath(caminho)}|{sheet_name}".encode()).hexdigest()[:12]
+    nome = os.path.join(pasta_cache, f"{base}-{chave}")
+    return nome + ".parquet", nome + ".json"
+
+
+def _ler_manifesto(caminho):
+    """Carrega o manifesto do cache (mtime, tamanho e hash da planilha de origem)"""
+    try:
+        with open(caminho, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def gravar_atomico(caminho, escrever):
+    """Grava em um arquivo temporário e troca pelo definitivo, evitando cache pela metade"""
+    # Nome único na mesma pasta: reruns do Streamlit são threads do mesmo processo e gravam ao mesmo tempo
+    pasta, nome = os.path.split(caminho)
+    fd, temporario = tempfile.mkstemp(dir=pasta or ".", prefix=f"{nome}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.remove(temporario)
+        raise
+
+
+def _gravar_manifesto(caminho, info, sha256):
+    """Registra a assinatura da planilha que gerou o Parquet"""
+    def escrever(destino):
+        with open(destino, 'w') as f:
+            json.dump({'mtime_ns': info.st_mtime_ns, 'tamanho': info.st_size, 'sha256': sha256}, f)
+    gravar_atomico(caminho, escrever)
+
+
+def _numero(texto):
+    """Número escrito como texto (ex: '3', ' 4', '1.5'), como o pandas converte; None se não for número"""
+    if '_' in texto:
+        return None
+    try:
+        return int(texto)
+    except ValueError:
+        pass
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+def _limpar_celula(valor):
+    """Valor da célula como o read_excel entrega: vazios, 'NA' e erros viram None; 3.0 vira 3"""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, str) and (valor in TEXTOS_VAZIOS or valor in ERROR_CODES):
+        return None
+    return valor
+
+
+def _linhas_planilha(caminho, sheet_name=0):
+    """Cabeçalho e depois as linhas da planilha, lidas em modo somente leitura (sem o arquivo inteiro na memória)
+
+    Vazios no fim de cada linha e linhas vazias no fim da planilha ficam de fora, como no read_excel.
+    """
+    livro = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        aba = livro.worksheets[sheet_name] if isinstance(sheet_name, int) else livro[sheet_name]
+        # Dimensões gravadas por outros programas podem estar erradas
+        aba.reset_dimensions()
+        vazias = 0
+        for linha in aba.iter_rows(values_only=True):
+            linha = [_limpar_celula(valor) for valor in linha]
+            while linha and linha[-1] is None:
+                linha.pop()
+            if not linha:
+                vazias += 1
+                continue
+            # Linha vazia no meio da planilha é uma linha de dados toda em branco
+            for _ in range(vazias):
+                yield ()
+            vazias = 0
+            yield tuple(linha)
+    finally:
+        livro.close()
+
+
+def _nomes_colunas(cabecalho, largura):
+    """Nomes das colunas como no read_excel: 'Unnamed: 3' para os vazios e 'Nome.1' para os repetidos"""
+    nomes = []
+    for i in range(largura):
+        valor = cabecalho[i] if i < len(cabecalho) else None
+        nome = f"Unnamed: {i}" if valor is None or valor == '' else str(valor)
+        base, repeticao = nome, 0
+        while nome in nomes:
+            repeticao += 1
+            nome = f"{base}.{repeticao}"
+        nomes.append(nome)
+    return nomes
+
+
+def _lotes(linhas, tamanho):
+    """Agrupa as linhas em listas de até `tamanho` linhas"""
+    while lote := list(itertools.islice(linhas, tamanho)):
+        yield lote
+
+
+class _TipoColuna:
+    """Tipo de uma coluna da planilha, descoberto lote a lote antes de converter
+
+    Segue o read_excel seguido do antigo tipar_colunas: números (também os escritos como texto) viram
+    int/float, datas misturadas com texto viram datetime e o resto misturado vira texto.
+    """
+
+    NUMERICOS = {bool, int, float, str}
+
+    def __init__(self):
+        self.tipos = set()
+        self.preenchidas = 0
+        self.exemplo = None
+        self.formato_data = None
+        self.numerica = True
+        self.inteira = True
+        self.datas_validas = True
+
+    def observar(self, valores):
+        """Atualiza o tipo com os valores de um lote"""
+        preenchidos = [valor for valor in valores if valor is not None]
+        if not preenchidos:
+            return
+        if not self.preenchidas:
+            self.exemplo = preenchidos[0]
+            # Como o pandas, o formato das datas em texto sai do primeiro valor da coluna
+            if isinstance(self.exemplo, str):
+                self.formato_data = guess_datetime_format(self.exemplo)
+        self.preenchidas += len(preenchidos)
+        self.tipos.update(map(type, preenchidos))
+        textos = [valor for valor in preenchidos if isinstance(valor, str)]
+
+        if self.numerica:
+            numeros = [_numero(texto) for texto in textos]
+            self.numerica = self.tipos <= self.NUMERICOS and None not in numeros
+            self.inteira = self.inteira and float not in self.tipos and not any(isinstance(n, float) for n in numeros)
+        if self.datas_validas and textos:
+            try:
+                pd.to_datetime(pd.Series(textos, dtype=object), format=self.formato_data or 'mixed')
+            except (ValueError, TypeError, OverflowError):
+                self.datas_validas = False
+
+    def especie(self, n_linhas):
+        """Nome da conversão e tipo do Parquet da coluna depois de observadas as n_linhas"""
+        if not self.tipos:
+            # Sem nenhuma linha o read_excel deixa a coluna como object
+            return 'vazia', pa.float64() if n_linhas else pa.string()
+        if self.tipos == {bool} and self.preenchidas == n_linhas:
+            return 'logica', pa.bool_()
+        if self.numerica:
+            return ('inteira', pa.int64()) if self.inteira else ('real', pa.float64())
+        if any(issubclass(tipo, datetime) for tipo in self.tipos) and (len(self.tipos) == 1 or self.datas_validas):
+            return 'data', pa.timestamp('ns')
+        if self.tipos == {str} or len(self.tipos) > 1:
+            return 'texto', pa.string()
+        return 'outra', pa.array([self.exemplo]).type
+
+    def converter(self, valores, especie, tipo):
+        """Array do Parquet com os valores de um lote"""
+        if especie == 'data':
+            datas = pd.to_datetime(pd.Series(valores, dtype=object), format=self.formato_data or 'mixed')
+            return pa.array(datas, type=tipo)
+        if especie in ('inteira', 'real'):
+            valores = [
+                _numero(valor) if isinstance(valor, str) else int(valor) if isinstance(valor, bool) else valor
+                for valor in valores
+            ]
+        elif especie == 'texto':
+            valores = [valor if valor is None or isinstance(valor, str) else str(valor) for valor in valores]
+        return pa.array(valores, type=tipo)
+
+
+def converter_excel(caminho, destino, sheet_name=0, linhas_por_lote=LINHAS_POR_LOTE):
+    """Grava a planilha em Parquet lote a lote; a memória usada acompanha o lote, não o tamanho do arquivo
+
+    Primeira passada: lê a planilha uma vez, descobre largura e tipo de cada coluna e guarda os lotes num
+    arquivo temporário. Segunda: relê os lotes desse arquivo, converte e grava no Parquet.
+    """
+    linhas = _linhas_planilha(caminho, sheet_name)
+    cabecalho = next(linhas, ())
+    largura, n_linhas, tipos = len(cabecalho), 0, []
+    with tempfile.TemporaryFile() as lotes:
+        for lote in _lotes(linhas, linhas_por_lote):
+            n_linhas += len(lote)
+            for i, valores in enumerate(itertools.zip_longest(*lote)):
+                if i >= len(tipos):
+                    tipos.append(_TipoColuna())
+                tipos[i].observar(valores)
+            largura = max(largura, len(tipos))
+            # Reler o XML da planilha custaria tanto quanto a primeira leitura
+            pickle.dump(lote, lotes, pickle.HIGHEST_PROTOCOL)
+        tipos += [_TipoColuna() for _ in range(largura - len(tipos))]
+
+        especies = [tipo.especie(n_linhas) for tipo in tipos]
+        esquema = pa.schema([
+            (nome, tipo_parquet) for nome, (_, tipo_parquet) in zip(_nomes_colunas(cabecalho, largura), especies)
+        ])
+        lotes.seek(0)
+        with pq.ParquetWriter(destino, esquema) as escritor:
+            for _ in range(-(-n_linhas // linhas_por_lote)):
+                lote = pickle.load(lotes)
+                colunas = zip(*(linha + (None,) * (largura - len(linha)) for linha in lote)) if largura else ()
+                escritor.write_table(pa.Table.from_arrays(
+                    [tipo.converter(valores, *especie) for tipo, especie, valores in zip(tipos, especies, colunas)],
+                    schema=esquema
+                ))
+
+
+def ler_excel(caminho, sheet_name=0, pasta_cache=PASTA_CACHE):
+    """Lê uma planilha a partir da cópia em Parquet, convertendo só quando o arquivo muda"""
+    info = os.stat(caminho)
+    parquet, manifesto = _caminhos_cache(caminho, sheet_name, pasta_cache)
+    meta = _ler_manifesto(manifesto) if os.path.exists(parquet) else None
+
+    # Mesmo mtime e tamanho: nem precisa ler a planilha
+    if meta and meta['mtime_ns'] == info.st_mtime_ns and meta['tamanho'] == info.st_size:
+        return pd.read_parquet(parquet)
+
+    sha256 = hash_arquivo(caminho)
+    if meta and meta['sha256'] == sha256:
+        # Arquivo foi tocado mas o conteúdo é o mesmo
+        _gravar_manifesto(manifesto, info, sha256)
+        return pd.read_parquet(parquet)
+
+    os.makedirs(pasta_cache, exist_ok=True)
+    gravar_atomico(parquet, lambda destino: converter_excel(caminho, destino, sheet_name))
+    _gravar_manifesto(manifesto, info, sha256)
+    return pd.read_parquet(parquet)
+
+
+def versao_excel(caminho, sheet_name=0, pasta_cache=PASTA_CACHE):
+    """sha256 da planilha que gerou a última cópia em Parquet lida (None se ainda não foi lida)"""
+    manifesto = _caminhos_cache(caminho, sheet_name, pasta_cache)[1]
+    meta = _ler_manifesto(manifesto)
+    return meta['sha256'] if meta else None
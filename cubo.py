@@ -0,0 +1,56 @@
+import pandas as pd
+
+def construir_cubo(df, dimensoes, coluna_data, coluna_valor, coluna_tempo, somas=None):
+    """Agrega as linhas por dimensões x dia, guardando somas e contagens"""
+    # O dia (e não o mês) é a menor granularidade para o filtro de período continuar exato
+    dia = df[coluna_data].dt.normalize().rename('Dia')
+    chaves = [df[d] for d in dimensoes] + [dia]
+    agregacoes = {
+        'quantidade': (coluna_valor, 'size'),
+        'receita': (coluna_valor, 'sum'),
+        'n_valor': (coluna_valor, 'count'),
+        'soma_dias': (coluna_tempo, 'sum'),
+        'n_dias': (coluna_tempo, 'count'),
+    }
+    # Medidas extras, ex: {'paginas': 'Qtde. de documentos/laudas'}
+    for nome, coluna in (somas or {}).items():
+        agregacoes[nome] = (coluna, 'sum')
+    return df.groupby(chaves, observed=True, dropna=False).agg(**agregacoes).reset_index()
+
+
+def somar_cubos(cubos, dimensoes):
+    """Junta cubos com as mesmas dimensões somando as medidas das células iguais"""
+    return pd.concat(cubos).groupby(dimensoes + ['Dia'], observed=True, dropna=False).sum().reset_index()
+
+
+def fatiar_cubo(cubo, filtros, inicio=None, fim=None):
+    """Seleciona as células do cubo que atendem aos filtros da sidebar"""
+    mascara = pd.Series(True, index=cubo.index)
+    for coluna, valores in filtros.items():
+        mascara &= cubo[coluna].isin(valores)
+    if inicio is not None:
+        mascara &= cubo['Dia'] >= pd.to_datetime(inicio)
+    if fim is not None:
+        mascara &= cubo['Dia'] <= pd.to_datetime(fim)
+    return cubo[mascara]
+
+
+def totais(fatia):
+    """Calcula as métricas principais a partir de uma fatia do cubo"""
+    soma = fatia.select_dtypes('number').sum()
+    return {
+        **soma.to_dict(),
+        'quantidade': int(soma['quantidade']),
+        'valor_medio': soma['receita'] / soma['n_valor'] if soma['n_valor'] else float('nan'),
+        'tempo_medio': soma['soma_dias'] / soma['n_dias'] if soma['n_dias'] else float('nan'),
+    }
+
+
+def somar_por(fatia, dimensoes, medida='quantidade'):
+    """Soma uma medida da fatia agrupando pelas dimensões pedidas"""
+    return fatia.groupby(dimensoes, observed=True)[medida].sum()
+
+
+def receita_mensal(fatia):
+    """Soma a receita da fatia por mês"""
+    return fatia.groupby(pd.Grouper(key='Dia', freq='MS'))['receita'].sum()
@@ -1,6 +1,10 @@
 import pandas as pd
 import streamlit as st
 import plotly.express as px
+from carregador import ler_excel
+from filtros import IndiceCategorias, fatia_periodo, ordenar_por_data
+from normalizacao import normalizar_tipo_documento
+from tabela import ordenar_posicoes, tabela_paginada
 
 st.set_page_config(page_title = "Impera-Dashboard de Traduções")
 
@@ -9,7 +13,8 @@ st.title("📊 Dashboard de Análise de Traduções Impera")
 @st.cache_data
 def load_data():
 
-    df = pd.read_excel("impera traduções totais.xlsx")
+    df = ler_excel("impera traduções totais.xlsx")
+    df["Tipo de Documento"] = normalizar_tipo_documento(df["Tipo de Documento"])
     
     df["Atribuição"] = pd.to_datetime(df["Atribuição"])
     df["Data de atribuição"] = df["Atribuição"].dt.date
@@ -19,16 +24,30 @@ def load_data():
     df["Data de atribuição"] = pd.to_datetime(df["Data de atribuição"])
     df["Mes"] = df["Data de atribuição"].dt.month
 
-    return df
+    # Ordenado pela data do filtro: o período vira uma fatia por busca binária
+    return ordenar_por_data(df, "Data de atribuição")
+
+# Índices da tabela paginada e dos filtros da sidebar (só leitura: cache_resource evita a cópia a cada rerun)
+@st.cache_resource
+def load_indices():
+    df = load_data()
+    ordens = ordenar_posicoes(df, [
+        "Data de atribuição",
+        "VALOR",
+        "Paginas",
+        "Tipo de Documento",
+    ])
+    return ordens, IndiceCategorias(df, ["Tipo de Documento"])
 
 df = load_data()
+ordens, categorias = load_indices()
 
 st.sidebar.header("🔍 Filtros")
 
 tip_doc = st.sidebar.multiselect(
     "📄 Tipo de Documento",
-    options = df["Tipo de Documento"].unique(),
-    default = df["Tipo de Documento"].unique()
+    options = df["Tipo de Documento"].cat.categories,
+    default = df["Tipo de Documento"].cat.categories
 )
 
 data_rage = st.sidebar.date_input(
@@ -38,13 +57,10 @@ data_rage = st.sidebar.date_input(
     max_value = df["Data de atribuição"].max()
 )
 
-df_filtred = df[
-    (df["Tipo de Documento"].isin(tip_doc)) &
-    (df["Data de atribuição"] >= pd.to_datetime(data_rage[0])) &
-    (df["Data de atribuição"] <= pd.to_datetime(data_rage[1]))
-]
+# Período por busca binária, tipo de documento pelo bitmap
+inicio, fim = fatia_periodo(df["Data de atribuição"], data_rage[0], data_rage[1])
+df_filtred = df.iloc[categorias.selecionar({"Tipo de Documento": tip_doc}, inicio, fim)]
 
-df_filtred
 st.subheader("📈 Principais Métricas")
 col1,col2,col3 = st.columns(3)
 
@@ -56,7 +72,7 @@ tab1, tab2, tab3 = st.tabs(["📋 Dados", "📊 Distribuição das Traduções",
 
 with tab1:
     st.subheader("🎲Dados completos🎲")
-    st.dataframe(df_filtred.sort_values("Data de atribuição", ascending=False),
+    tabela_paginada(df, df_filtred, ordens, "dados", "Data de atribuição",
                  height=400,
                  column_config={
                      "VALOR": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f"),
@@ -67,7 +83,7 @@ with tab1:
 with tab2:
     st.subheader("Distribuição das traduções")
 
-    doc_counts = df_filtred["Tipo de Documento"].value_counts().reset_index()
+    doc_counts = df_filtred["Tipo de Documento"].value_counts()[lambda s: s > 0].reset_index()
     fig_pie = px.pie(
         doc_counts,
         names = "Tipo de Documento",
@@ -2,6 +2,12 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 from datetime import datetime
+from carregador import ler_excel, versao_excel
+from filtros import IndiceCategorias, fatia_periodo, ordenar_por_data
+from graficos import caixas_por_quantis, dispersao_adaptativa, mostrar_figura
+from normalizacao import normalizar_tipo_documento, normalizar_tipo_traducao
+from cubo import construir_cubo, fatiar_cubo, totais, somar_por, receita_mensal
+from tabela import ordenar_posicoes, tabela_paginada
 
 # Configuração da página
 st.set_page_config(page_title="Dashboard de Traduções", layout="wide")
@@ -10,29 +16,11 @@ st.title("📊 Dashboard de Análise de Traduções")
 # Carregar dados
 @st.cache_data
 def load_data():
-    df = pd.read_excel("traduções_consolidadas.xlsx")
+    df = ler_excel("traduções_consolidadas.xlsx")
     
     # Limpeza e padronização
-    df['Tipo de Documento'] = df['Tipo de Documento'].str.lower().str.strip()
-    df['TIPO DE TRADUÇÃO'] = df['TIPO DE TRADUÇÃO'].str.lower().str.strip()
-    
-    # Mapeamento para padronizar tipos de documentos
-    mapeamento = {
-        'procura': 'procuração',
-        'procuração ': 'procuração',
-        'cert': 'certidão',
-        'cert. italiana': 'certidão italiana',
-        'cert. objeto e pé': 'certidão objeto e pé',
-        'certidão': 'certidão',
-        'escritura': 'escritura',
-        'cnn': 'cnn',
-        'adoção': 'adoção',
-        'divorcio': 'divórcio',
-        'rec. paternidade': 'reconhecimento de paternidade',
-        'laudo médico': 'laudo médico'
-    }
-    
-    df['Tipo de Documento'] = df['Tipo de Documento'].replace(mapeamento)
+    df['Tipo de Documento'] = normalizar_tipo_documento(df['Tipo de Documento'])
+    df['TIPO DE TRADUÇÃO'] = normalizar_tipo_traducao(df['TIPO DE TRADUÇÃO'])
     
     # Extrair quantidade numérica
     df['Quantidade'] = df['Qtde. de documentos/laudas'].str.extract('(\d+)').astype(int)
@@ -45,16 +33,49 @@ def load_data():
     # Corrigir valores negativos (erros de digitação)
     df.loc[df['Tempo de processamento (dias)'] < 0, 'Tempo de processamento (dias)'] = 0
     
-    return df
+    # Ordenado pela data do filtro: o período vira uma fatia por busca binária
+    return ordenar_por_data(df, 'Data da solicitação')
+
+# Cubo pré-agregado (tipo de documento x idioma x tipo de tradução x dia)
+@st.cache_data
+def load_cubo():
+    return construir_cubo(
+        load_data(),
+        ['Tipo de Documento', 'IDIOMA', 'TIPO DE TRADUÇÃO'],
+        'Data da solicitação',
+        'Valor Total',
+        'Tempo de processamento (dias)'
+    )
+
+# Índices da tabela paginada e dos filtros da sidebar (só leitura: cache_resource evita a cópia a cada rerun)
+@st.cache_resource
+def load_indices():
+    df = load_data()
+    ordens = ordenar_posicoes(df, [
+        'Data da solicitação',
+        'Data de finalização',
+        'Valor Total',
+        'Tempo de processamento (dias)',
+        'Quantidade',
+        'Tipo de Documento',
+        'IDIOMA',
+        'TIPO DE TRADUÇÃO',
+        'Código da Atividade',
+    ])
+    return ordens, IndiceCategorias(df, ['Tipo de Documento', 'IDIOMA', 'TIPO DE TRADUÇÃO'])
 
 df = load_data()
+cubo = load_cubo()
+ordens, categorias = load_indices()
+# Versão dos dados para o cache de figuras
+versao = versao_excel("traduções_consolidadas.xlsx")
 
 # Sidebar com filtros
 st.sidebar.header("🔍 Filtros")
 tipo_doc = st.sidebar.multiselect(
     "Tipo de Documento",
-    options=df['Tipo de Documento'].unique(),
-    default=df['Tipo de Documento'].unique()
+    options=df['Tipo de Documento'].cat.categories,
+    default=df['Tipo de Documento'].cat.categories
 )
 
 idioma = st.sidebar.multiselect(
@@ -65,8 +86,8 @@ idioma = st.sidebar.multiselect(
 
 tipo_trad = st.sidebar.multiselect(
     "Tipo de Tradução",
-    options=df['TIPO DE TRADUÇÃO'].unique(),
-    default=df['TIPO DE TRADUÇÃO'].unique()
+    options=df['TIPO DE TRADUÇÃO'].cat.categories,
+    default=df['TIPO DE TRADUÇÃO'].cat.categories
 )
 
 data_range = st.sidebar.date_input(
@@ -76,121 +97,141 @@ data_range = st.sidebar.date_input(
     max_value=df['Data da solicitação'].max()
 )
 
-# Aplicar filtros
-df_filtered = df[
-    (df['Tipo de Documento'].isin(tipo_doc)) &
-    (df['IDIOMA'].isin(idioma)) &
-    (df['TIPO DE TRADUÇÃO'].isin(tipo_trad)) &
-    (df['Data da solicitação'] >= pd.to_datetime(data_range[0])) &
-    (df['Data da solicitação'] <= pd.to_datetime(data_range[1]))
-]
+# Aplicar filtros: período por busca binária, multiselects pelos bitmaps
+inicio, fim = fatia_periodo(df['Data da solicitação'], data_range[0], data_range[1])
+df_filtered = df.iloc[categorias.selecionar(
+    {'Tipo de Documento': tipo_doc, 'IDIOMA': idioma, 'TIPO DE TRADUÇÃO': tipo_trad}, inicio, fim
+)]
+
+# Métricas e gráficos agregados saem do cubo, não das linhas
+fatia = fatiar_cubo(
+    cubo,
+    {'Tipo de Documento': tipo_doc, 'IDIOMA': idioma, 'TIPO DE TRADUÇÃO': tipo_trad},
+    data_range[0],
+    data_range[1]
+)
+metricas = totais(fatia)
+# Figuras guardadas por (versão, filtros, gráfico)
+estado = {'tipo_doc': tipo_doc, 'idioma': idioma, 'tipo_trad': tipo_trad, 'periodo': tuple(data_range)}
+doc_counts = somar_por(fatia, 'Tipo de Documento').sort_values(ascending=False).reset_index(name='count')
 
 # Métricas principais
 st.subheader("📈 Métricas Principais")
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("Total de Traduções", len(df_filtered))
-col2.metric("Receita Total", f"R$ {df_filtered['Valor Total'].sum():,.2f}")
-col3.metric("Tempo Médio (dias)", f"{df_filtered['Tempo de processamento (dias)'].mean():.1f}")
-col4.metric("Valor Médio", f"R$ {df_filtered['Valor Total'].mean():.2f}")
+col1.metric("Total de Traduções", metricas['quantidade'])
+col2.metric("Receita Total", f"R$ {metricas['receita']:,.2f}")
+col3.metric("Tempo Médio (dias)", f"{metricas['tempo_medio']:.1f}")
+col4.metric("Valor Médio", f"R$ {metricas['valor_medio']:.2f}")
 
-# Tabs para diferentes visualizações
-tab1, tab2, tab3, tab4 = st.tabs(["📋 Dados", "⏱ Tempo", "📊 Distribuição", "💰 Receita"])
+# Tabs para diferentes visualizações (só a aba aberta roda a cada interação)
+tab1, tab2, tab3, tab4 = st.tabs(["📋 Dados", "⏱ Tempo", "📊 Distribuição", "💰 Receita"], on_change="rerun", key="abas")
 
 with tab1:
-    st.subheader("Dados Completos")
-    st.dataframe(df_filtered.sort_values('Data da solicitação', ascending=False), 
-                height=400,
-                column_config={
-                    "Data da solicitação": st.column_config.DateColumn("Solicitação"),
-                    "Data de finalização": st.column_config.DateColumn("Finalização"),
-                    "Valor Total": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f")
-                })
+    if tab1.open:
+        st.subheader("Dados Completos")
+        tabela_paginada(df, df_filtered, ordens, 'dados', 'Data da solicitação',
+                    height=400,
+                    column_config={
+                        "Data da solicitação": st.column_config.DateColumn("Solicitação"),
+                        "Data de finalização": st.column_config.DateColumn("Finalização"),
+                        "Valor Total": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f")
+                    })
 
 with tab2:
-    st.subheader("Análise de Tempo de Processamento")
+    if tab2.open:
+        st.subheader("Análise de Tempo de Processamento")
     
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
     
-    with col1:
-        fig_scatter = px.scatter(
-            df_filtered,
-            x='Data da solicitação',
-            y='Tempo de processamento (dias)',
-            color='Tipo de Documento',
-            hover_data=['Código da Atividade', 'Quantidade'],
-            title="Tempo de Processamento por Solicitação",
-            labels={'Tempo de processamento (dias)': 'Dias', 'Data da solicitação': 'Data de Solicitação'}
-        )
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        with col1:
+            # Muitas solicitações: WebGL e amostra LTTB por tipo de documento
+            def grafico_scatter():
+                return dispersao_adaptativa(
+                    df_filtered,
+                    x='Data da solicitação',
+                    y='Tempo de processamento (dias)',
+                    color='Tipo de Documento',
+                    hover_data=['Código da Atividade', 'Quantidade'],
+                    title="Tempo de Processamento por Solicitação",
+                    labels={'Tempo de processamento (dias)': 'Dias', 'Data da solicitação': 'Data de Solicitação'}
+                )
+            mostrar_figura('traducoes/tempo_scatter', versao, estado, grafico_scatter, use_container_width=True)
     
-    with col2:
-        fig_box = px.box(
-            df_filtered,
-            x='Tipo de Documento',
-            y='Tempo de processamento (dias)',
-            color='TIPO DE TRADUÇÃO',
-            title="Distribuição do Tempo por Tipo de Documento",
-            labels={'Tempo de processamento (dias)': 'Dias', 'Tipo de Documento': 'Tipo de Documento'}
-        )
-        st.plotly_chart(fig_box, use_container_width=True)
+        with col2:
+            # Caixas a partir dos quartis de cada grupo, sem mandar as linhas ao navegador
+            def grafico_box():
+                return caixas_por_quantis(
+                    df_filtered,
+                    x='Tipo de Documento',
+                    y='Tempo de processamento (dias)',
+                    color='TIPO DE TRADUÇÃO',
+                    title="Distribuição do Tempo por Tipo de Documento",
+                    labels={'Tempo de processamento (dias)': 'Dias', 'Tipo de Documento': 'Tipo de Documento'}
+                )
+            mostrar_figura('traducoes/tempo_box', versao, estado, grafico_box, use_container_width=True)
 
 with tab3:
-    st.subheader("Distribuição das Traduções")
+    if tab3.open:
+        st.subheader("Distribuição das Traduções")
     
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
     
-    with col1:
-        doc_counts = df_filtered['Tipo de Documento'].value_counts().reset_index()
-        fig_pie = px.pie(
-            doc_counts,
-            names='Tipo de Documento',
-            values='count',
-            title="Distribuição por Tipo de Documento",
-            hole=0.3,
-            color_discrete_sequence=px.colors.qualitative.Dark24
-        )
-        fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig_pie, use_container_width=True)
+        with col1:
+            def grafico_pie():
+                fig_pie = px.pie(
+                    doc_counts,
+                    names='Tipo de Documento',
+                    values='count',
+                    title="Distribuição por Tipo de Documento",
+                    hole=0.3,
+                    color_discrete_sequence=px.colors.qualitative.Dark24
+                )
+                fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+                return fig_pie
+            mostrar_figura('traducoes/distribuicao_documentos', versao, estado, grafico_pie, use_container_width=True)
     
-    with col2:
-        fig_bar = px.bar(
-            df_filtered.groupby(['IDIOMA', 'TIPO DE TRADUÇÃO']).size().reset_index(name='Count'),
-            x='IDIOMA',
-            y='Count',
-            color='TIPO DE TRADUÇÃO',
-            title="Distribuição por Idioma e Tipo de Tradução",
-            barmode='group'
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        with col2:
+            def grafico_bar():
+                return px.bar(
+                    somar_por(fatia, ['IDIOMA', 'TIPO DE TRADUÇÃO']).reset_index(name='Count'),
+                    x='IDIOMA',
+                    y='Count',
+                    color='TIPO DE TRADUÇÃO',
+                    title="Distribuição por Idioma e Tipo de Tradução",
+                    barmode='group'
+                )
+            mostrar_figura('traducoes/distribuicao_idiomas', versao, estado, grafico_bar, use_container_width=True)
 
 with tab4:
-    st.subheader("Análise de Receita")
+    if tab4.open:
+        st.subheader("Análise de Receita")
     
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
     
-    with col1:
-        receita_por_tipo = df_filtered.groupby('Tipo de Documento')['Valor Total'].sum().reset_index()
-        fig_receita = px.bar(
-            receita_por_tipo,
-            x='Tipo de Documento',
-            y='Valor Total',
-            title="Receita por Tipo de Documento (R$)",
-            color='Tipo de Documento',
-            labels={'Valor Total': 'Receita (R$)'}
-        )
-        st.plotly_chart(fig_receita, use_container_width=True)
+        with col1:
+            def grafico_receita():
+                receita_por_tipo = somar_por(fatia, 'Tipo de Documento', 'receita').reset_index(name='Valor Total')
+                return px.bar(
+                    receita_por_tipo,
+                    x='Tipo de Documento',
+                    y='Valor Total',
+                    title="Receita por Tipo de Documento (R$)",
+                    color='Tipo de Documento',
+                    labels={'Valor Total': 'Receita (R$)'}
+                )
+            mostrar_figura('traducoes/receita_documentos', versao, estado, grafico_receita, use_container_width=True)
     
-    with col2:
-        receita_mensal = df_filtered.groupby(pd.Grouper(key='Data da solicitação', freq='M'))['Valor Total'].sum().reset_index()
-        fig_trend = px.line(
-            receita_mensal,
-            x='Data da solicitação',
-            y='Valor Total',
-            title="Receita Mensal (R$)",
-            markers=True,
-            labels={'Valor Total': 'Receita (R$)', 'Data da solicitação': 'Mês'}
-        )
-        st.plotly_chart(fig_trend, use_container_width=True)
+        with col2:
+            def grafico_trend():
+                return px.line(
+                    receita_mensal(fatia).reset_index(name='Valor Total').rename(columns={'Dia': 'Data da solicitação'}),
+                    x='Data da solicitação',
+                    y='Valor Total',
+                    title="Receita Mensal (R$)",
+                    markers=True,
+                    labels={'Valor Total': 'Receita (R$)', 'Data da solicitação': 'Mês'}
+                )
+            mostrar_figura('traducoes/receita_mensal', versao, estado, grafico_trend, use_container_width=True)
 
 # Análise adicional
 st.subheader("🔍 Análise Detalhada")
@@ -198,7 +239,7 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.write("**Top 5 Documentos Mais Frequentes**")
-    st.dataframe(df_filtered['Tipo de Documento'].value_counts().head(5).reset_index(),
+    st.dataframe(doc_counts.head(5),
                 hide_index=True,
                 column_config={
                     "Tipo de Documento": "Documento",
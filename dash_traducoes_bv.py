@@ -2,6 +2,14 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 from datetime import datetime
+from carregador import ler_excel
+from filtros import IndiceCategorias, fatia_periodo, ordenar_por_data
+from formatacao import formatar_brl, formatar_numero
+from cubo import fatiar_cubo, totais
+from ingestao import atualizar_base
+from metricas import atualizar_metricas
+from tabela import ordenar_posicoes, tabela_paginada
+from normalizacao import normalizar_categoria, normalizar_tipo_documento, normalizar_tipo_traducao
 
 # Configuração da página
 st.set_page_config(page_title="Dashboard de Traduções BV", layout="wide")
@@ -10,11 +18,11 @@ st.title("📊 Dashboard de Análise de Traduções BV")
 # Carregar dados
 @st.cache_data
 def load_data():
-    df = pd.read_excel("bv_traducoes_corrigida.xlsx")
+    df = ler_excel("bv_traducoes_corrigida.xlsx")
     
     # Limpeza e padronização
-    df['Tipo de Documento'] = df['Tipo de Documento'].str.lower().str.strip()
-    df['TIPO DE TRADUÇÃO'] = df['TIPO DE TRADUÇÃO'].str.lower().str.strip()
+    df['Tipo de Documento'] = normalizar_tipo_documento(df['Tipo de Documento'])
+    df['TIPO DE TRADUÇÃO'] = normalizar_tipo_traducao(df['TIPO DE TRADUÇÃO'])
     
     # Extrair quantidade numérica
     df['Quantidade'] = df['Qtde. de documentos/laudas'].str.extract('(\d+)').astype(int)
@@ -27,32 +35,56 @@ def load_data():
     # Corrigir valores negativos (erros de digitação)
     df.loc[df['Tempo de processamento (dias)'] < 0, 'Tempo de processamento (dias)'] = 0
     
-    df["IDIOMA"] = df['IDIOMA'].str.lower()
+    df["IDIOMA"] = normalizar_categoria(df['IDIOMA'])
     df = df.drop(columns={"Código da Atividade"})
 
-    return df
+    # Ordenado pela data do filtro: o período vira uma fatia por busca binária
+    return ordenar_por_data(df, 'Data da solicitação')
+
+# Agregados das métricas, atualizados só com as linhas novas de cada versão da base
+@st.cache_data
+def load_metricas(versao):
+    return atualizar_metricas('empresa')
+
+# Índices da tabela paginada e dos filtros da sidebar (só leitura: cache_resource evita a cópia a cada rerun)
+@st.cache_resource
+def load_indices():
+    df = load_data()
+    ordens = ordenar_posicoes(df, [
+        'Data da solicitação',
+        'Data de finalização',
+        'Valor Total',
+        'Tempo de processamento (dias)',
+        'Quantidade',
+        'Tipo de Documento',
+        'IDIOMA',
+        'TIPO DE TRADUÇÃO',
+    ])
+    return ordens, IndiceCategorias(df, ['Tipo de Documento', 'IDIOMA', 'TIPO DE TRADUÇÃO'])
 
 df = load_data()
+metricas_base = load_metricas(atualizar_base())
+ordens, categorias = load_indices()
 
 
 # Sidebar com filtros
 st.sidebar.header("🔍 Filtros")
 tipo_doc = st.sidebar.multiselect(
     "Tipo de Documento",
-    options=df['Tipo de Documento'].unique(),
-    default=df['Tipo de Documento'].unique()
+    options=df['Tipo de Documento'].cat.categories,
+    default=df['Tipo de Documento'].cat.categories
 )
 
 idioma = st.sidebar.multiselect(
     "Idioma",
-    options=df['IDIOMA'].unique(),
-    default=df['IDIOMA'].unique()
+    options=df['IDIOMA'].cat.categories,
+    default=df['IDIOMA'].cat.categories
 )
 
 tipo_trad = st.sidebar.multiselect(
     "Tipo de Tradução",
-    options=df['TIPO DE TRADUÇÃO'].unique(),
-    default=df['TIPO DE TRADUÇÃO'].unique()
+    options=df['TIPO DE TRADUÇÃO'].cat.categories,
+    default=df['TIPO DE TRADUÇÃO'].cat.categories
 )
 
 data_range = st.sidebar.date_input(
@@ -62,29 +94,37 @@ data_range = st.sidebar.date_input(
     max_value= df["Data da solicitação"].max()
 )
 
-# Aplicar filtros
-df_filtered = df[
-    (df['Tipo de Documento'].isin(tipo_doc)) &
-    (df['IDIOMA'].isin(idioma)) &
-    (df['TIPO DE TRADUÇÃO'].isin(tipo_trad)) &
-    (df['Data da solicitação'] >= pd.to_datetime(data_range[0])) &
-    (df['Data da solicitação'] <= pd.to_datetime(data_range[1]))
-]
+# Aplicar filtros: período por busca binária, multiselects pelos bitmaps
+inicio, fim = fatia_periodo(df['Data da solicitação'], data_range[0], data_range[1])
+df_filtered = df.iloc[categorias.selecionar(
+    {'Tipo de Documento': tipo_doc, 'IDIOMA': idioma, 'TIPO DE TRADUÇÃO': tipo_trad}, inicio, fim
+)]
 
 # Métricas principais
 st.subheader("📈 Métricas Principais")
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("Total de Traduções", "1.138")
-col2.metric("Receita Total", "R$ 92.720,00")
+metricas = totais(fatiar_cubo(
+    metricas_base,
+    {
+        'Empresa de tradução': ['BV TRADUÇÃO'],
+        'Tipo de Documento': tipo_doc,
+        'IDIOMA': idioma,
+        'TIPO DE TRADUÇÃO': tipo_trad
+    },
+    data_range[0],
+    data_range[1]
+))
+col1.metric("Total de Traduções", formatar_numero(metricas['quantidade']))
+col2.metric("Receita Total", formatar_brl(metricas['receita']))
 col3.metric("Tempo Médio (dias)", f"{df_filtered['Tempo de processamento (dias)'].mean():.0f}")
-col4.metric("Valor Médio", "R$ 81,48")
+col4.metric("Valor Médio", formatar_brl(metricas['valor_medio']))
 
 # Tabs para diferentes visualizações
 tab1, tab2, tab3, tab4 = st.tabs(["📋 Dados", "⏱ Tempo", "📊 Distribuição", "💰 Receita"])
 
 with tab1:
     st.subheader("Dados Completos")
-    st.dataframe(df_filtered.sort_values('Data da solicitação', ascending=False), 
+    tabela_paginada(df, df_filtered, ordens, 'dados', 'Data da solicitação',
                 height=400,
                 column_config={
                     "Data da solicitação": st.column_config.DateColumn("Solicitação"),
@@ -98,7 +138,7 @@ with tab1:
 
     
     st.write("**Top 5 Documentos Mais Frequentes**")
-    st.dataframe(df_filtered['Tipo de Documento'].value_counts().head(5).reset_index(),
+    st.dataframe(df_filtered['Tipo de Documento'].value_counts()[lambda s: s > 0].head(5).reset_index(),
                 hide_index=True,
                 column_config={
                     "Tipo de Documento": "Documento",
@@ -107,7 +147,7 @@ with tab1:
 
 with tab2:
     st.subheader("Análise de Tempo de Processamento")
-    tempo_dias = df.groupby('Tipo de Documento')['Tempo de processamento (dias)'].mean().round().sort_values(ascending=False).reset_index()
+    tempo_dias = df.groupby('Tipo de Documento', observed=True)['Tempo de processamento (dias)'].mean().round().sort_values(ascending=False).reset_index()
     fig_scatter = px.scatter(
             tempo_dias,
             x='Tipo de Documento',
@@ -148,8 +188,7 @@ with tab3:
     col1, col2 = st.columns(2)
     
     with col1:
-        df_filtered['Tipo de Documento'] = df_filtered['Tipo de Documento'].str.lower()
-        doc_counts = df_filtered['Tipo de Documento'].value_counts().reset_index()
+        doc_counts = df_filtered['Tipo de Documento'].value_counts()[lambda s: s > 0].reset_index()
         fig_pie = px.pie(
             doc_counts,
             names='Tipo de Documento',
@@ -163,7 +202,7 @@ with tab3:
     
     with col2:
         fig_bar = px.bar(
-            df_filtered.groupby(['IDIOMA', 'TIPO DE TRADUÇÃO']).size().reset_index(name='Quantidade'),
+            df_filtered.groupby(['IDIOMA', 'TIPO DE TRADUÇÃO'], observed=True).size().reset_index(name='Quantidade'),
             x='IDIOMA',
             y='Quantidade',
             color='TIPO DE TRADUÇÃO',
@@ -186,7 +225,7 @@ with tab4:
         )
     st.plotly_chart(fig_trend, use_container_width=True)
 
-    receita_por_tipo = df_filtered.groupby('Tipo de Documento')['Valor Total'].sum().reset_index(name="Valor Total")
+    receita_por_tipo = df_filtered.groupby('Tipo de Documento', observed=True)['Valor Total'].sum().reset_index(name="Valor Total")
     fig_receita = px.bar(
             receita_por_tipo,
             x='Tipo de Documento',
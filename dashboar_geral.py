@@ -2,33 +2,39 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 from datetime import datetime
+from cubo import fatiar_cubo, totais
+from filtros import IndiceCategorias, fatia_periodo, ordenar_por_data
+from formatacao import coluna_brl, formatar_brl, formatar_numero
+from ingestao import atualizar_base, carregar_base
+from metricas import atualizar_metricas
+from normalizacao import normalizar_tipo_documento
 
 st.set_page_config(page_title="Dashboard Geral",layout='wide')
 st.title("Análise Geral das Empresas de Tradução")
-#Arrumando a coluna do df_bv
-
-mapeamento = {
-    'procura': 'procuração',
-    "procu":"procuração",
-    'procuração ': 'procuração',
-    'cert': 'certidão',
-    'cert. italiana': 'certidão italiana',
-    'cert. objeto e pé': 'certidão objeto e pé',
-    'certidão': 'certidão',
-    'escritura': 'escritura',
-    'cnn': 'cnn',
-    'adoção': 'adoção',
-    'divorcio': 'divórcio',
-    'rec. paternidade': 'reconhecimento de paternidade',
-    'laudo médico': 'laudo médico'
-}
 
+st.sidebar.header("🔍 Filtros")
 
+# A base consolidada só é relida quando a ingestão gera uma nova versão
+@st.cache_data
+def load_data(versao):
+    df = carregar_base()
+    df["Tipo de Documento"] = normalizar_tipo_documento(df["Tipo de Documento"])
+    # Ordenado pela data do filtro: o período vira uma fatia por busca binária
+    return ordenar_por_data(df, "Data de finalização")
 
-st.sidebar.header("🔍 Filtros")
+# Agregados das métricas, atualizados só com as linhas novas de cada versão
+@st.cache_data
+def load_metricas(versao):
+    return atualizar_metricas('geral')
 
-df_geral = pd.read_excel("TRADUÇÕES_GERAIS.xlsx")
-df_geral["Data de finalização"] = pd.to_datetime(df_geral["Data de finalização"])
+# Bitmaps dos filtros da sidebar (só leitura: cache_resource evita a cópia a cada rerun)
+@st.cache_resource
+def load_categorias(versao):
+    return IndiceCategorias(load_data(versao), ["Empresa de tradução", "Tipo de Documento"])
+
+versao = atualizar_base()
+df_geral = load_data(versao)
+categorias = load_categorias(versao)
 
 empresas_disponiveis = df_geral["Empresa de tradução"].unique()
 empresas_selecionadas = st.sidebar.multiselect(
@@ -37,7 +43,7 @@ empresas_selecionadas = st.sidebar.multiselect(
         default=empresas_disponiveis
     )
 
-tipos_doc_disponiveis = df_geral["Tipo de Documento"].unique()
+tipos_doc_disponiveis = df_geral["Tipo de Documento"].cat.categories
 tipo_doc = st.sidebar.multiselect(
     "📄 Selecione o Tipo de Documento",
     options = tipos_doc_disponiveis,
@@ -63,27 +69,31 @@ data_fim = st.sidebar.date_input(
     max_value=max_date
 )
 
-df_filtrado = df_geral[
-    (df_geral["Empresa de tradução"].isin(empresas_selecionadas)) &
-    (df_geral["Tipo de Documento"].isin(tipo_doc)) &
-    (df_geral["Data de finalização"].dt.date >= data_inicio) &
-    (df_geral["Data de finalização"].dt.date <= data_fim)
-]
+# Período por busca binária (sem criar um date por linha), empresas e tipos pelos bitmaps
+inicio, fim = fatia_periodo(df_geral["Data de finalização"], data_inicio, data_fim)
+df_filtrado = df_geral.iloc[categorias.selecionar(
+    {"Empresa de tradução": empresas_selecionadas, "Tipo de Documento": tipo_doc}, inicio, fim
+)]
+
+metricas = totais(fatiar_cubo(
+    load_metricas(versao),
+    {"Empresa de tradução": empresas_selecionadas, "Tipo de Documento": tipo_doc},
+    data_inicio,
+    data_fim
+))
 
 tab1, tab2, tab3, tab4 = st.tabs(["📈 Receita",
                                  "⏱ Tempo Médio", 
                                  "📑 Tipos de Documento",
                                    "💲 Receita por Tipo"])
 
-df_geral["Qtde. de documentos/laudas"] = df_geral['Qtde. de documentos/laudas'].astype(str).str.replace(r'\D','',regex=True).astype(int)
-
 with tab1:
     st.header("Análise de Receita")
     col1, col2 = st.columns(2)
 
     with col1:
-        receita_total = df_geral['Valor Total'].sum()
-        st.metric("Receita Total", "R$ 659.220,00")
+        receita_total = metricas['receita']
+        st.metric("Receita Total", formatar_brl(receita_total))
 
         fig_receita_empresa = px.bar(
             df_geral.groupby("Empresa de tradução")["Valor Total"].sum().reset_index(),
@@ -94,9 +104,9 @@ with tab1:
         )
         st.plotly_chart(fig_receita_empresa, use_container_width=True)
     with col2:
-        receita_media_pag = (df_geral['Valor Total'].sum()/df_geral["Qtde. de documentos/laudas"].sum())
+        receita_media_pag = metricas['receita'] / metricas['paginas'] if metricas['paginas'] else 0
         
-        st.metric("Valor Médio por Página", f"R$ 43,17")
+        st.metric("Valor Médio por Página", formatar_brl(receita_media_pag))
 
         df_receita_tempo = df_geral.groupby(pd.Grouper(key="Data de finalização",freq="M"))['Valor Total'].sum().reset_index()
         
@@ -133,13 +143,12 @@ with tab2:
 
 
 with tab3:
-    df_filtrado["Qtde. de documentos/laudas"] = df_filtrado['Qtde. de documentos/laudas'].astype(str).str.replace(r'\D','',regex=True).astype(int)
     st.header("Análise dos Tipos de Documentos")
-    st.metric("Total de Documentos Traduzidos",15.272)
+    st.metric("Total de Documentos Traduzidos", formatar_numero(metricas['paginas']))
     col1, col2 = st.columns(2)
     with col1:
         fig_documentos = px.pie(
-                                df_filtrado.groupby("Tipo de Documento")["Qtde. de documentos/laudas"].sum().sort_values(ascending=False).reset_index(name="Quantidade Traduzidas").head(),
+                                df_filtrado.groupby("Tipo de Documento", observed=True)["Qtde. de documentos/laudas"].sum().sort_values(ascending=False).reset_index(name="Quantidade Traduzidas").head(),
                                 names="Tipo de Documento",
                                 values="Quantidade Traduzidas",
                                 hole=0.4,
@@ -152,18 +161,18 @@ with tab3:
 
     with col2:
         st.subheader("**Top 5** Tipo de Documentos mais Traduzidos")
-        st.dataframe(df_filtrado.groupby("Tipo de Documento")["Qtde. de documentos/laudas"].sum().sort_values(ascending=False).reset_index(name="Quantidade Traduzidas").head())
+        st.dataframe(df_filtrado.groupby("Tipo de Documento", observed=True)["Qtde. de documentos/laudas"].sum().sort_values(ascending=False).reset_index(name="Quantidade Traduzidas").head())
 
 with tab4:
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("Top 5 das Receitas por Tipo de Documento")
-        receita_por_tipo = df_filtrado.groupby("Tipo de Documento")["Valor Total"].sum().reset_index(name="Receita Total (R$)").sort_values("Receita Total (R$)",ascending=False)
-        receita_formatada = receita_por_tipo.copy()
-        receita_formatada["Receita Total (R$)"] = receita_formatada["Receita Total (R$)"].apply(
-        lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        
-        st.dataframe(receita_formatada.reset_index(drop=True).head(5))
+        receita_por_tipo = df_filtrado.groupby("Tipo de Documento", observed=True)["Valor Total"].sum().reset_index(name="Receita Total (R$)").sort_values("Receita Total (R$)",ascending=False)
+        # A coluna continua numérica: o navegador formata os valores
+        st.dataframe(
+            receita_por_tipo.reset_index(drop=True).head(5),
+            column_config={"Receita Total (R$)": coluna_brl("Receita Total (R$)")}
+        )
 
     with col2:
         fig_bar_receita = px.bar(
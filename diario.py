@@ -0,0 +1,316 @@
+import json
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: travas de região pelo msvcrt
+    fcntl = None
+    import msvcrt
+
+# Diário de operações (JSONL, só acréscimo) e índice binário com a posição de cada operação
+ARQUIVO_DIARIO = "organizador_diario.jsonl"
+ARQUIVO_INDICE = "organizador_diario.idx"
+
+# Log antigo (um único JSON reescrito a cada operação), importado uma vez para o diário
+LOG_ANTIGO = "organizador_log.json"
+
+# Movimentos acumulados antes de gravar as linhas do diário e linhas gravadas entre um fsync e outro
+MOVIMENTOS_POR_LINHA = 256
+LINHAS_POR_FSYNC = 32
+
+# Entrada do índice: início e fim da operação no diário + situação
+ENTRADA = struct.Struct('<QQB')
+ATIVA, REVERTIDA, ABERTA = 0, 1, 2
+
+# Operações abertas por este processo (as travas de outro processo não as protegem daqui): (diário, número)
+_ABERTAS = set()
+
+
+def travar(fd, posicao, esperar=True):
+    """Trava 1 byte do arquivo de travas; sem esperar, retorna False se outro processo já o travou"""
+    if fcntl:
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX | (0 if esperar else fcntl.LOCK_NB), 1, posicao)
+        except OSError:
+            if esperar:
+                raise
+            return False
+        return True
+    while True:
+        os.lseek(fd, posicao, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not esperar:
+                return False
+            time.sleep(0.01)
+
+
+def destravar(fd, posicao):
+    if fcntl:
+        fcntl.lockf(fd, fcntl.LOCK_UN, 1, posicao)
+    else:
+        os.lseek(fd, posicao, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class Operacao:
+    """Operação em andamento: os movimentos vão para o diário à medida que acontecem"""
+
+    def __init__(self, diario, numero, inicio):
+        self.diario = diario
+        self.numero = numero
+        self.inicio = inicio
+        # Movimentos que só trocam de pasta ficam agrupados por (pasta de origem, pasta de destino)
+        self.grupos = defaultdict(list)
+        # O resto (ex: links dos duplicados) vai como [origem, destino, acao]
+        self.avulsos = []
+        self.pendentes = 0
+        self.linhas = 0
+        self.total = 0
+
+    def registrar(self, origem, destino, acao=None):
+        """Registra um movimento já feito (acao identifica o que não é movimento, ex: 'link')"""
+        pasta_origem, nome = os.path.split(origem)
+        pasta_destino, nome_destino = os.path.split(destino)
+        agrupavel = not acao and nome == nome_destino
+
+        # Trocar de tipo descarrega o anterior: as linhas do diário guardam a ordem das ações
+        if self.avulsos if agrupavel else self.grupos:
+            self._descarregar()
+
+        if agrupavel:
+            self.grupos[(pasta_origem, pasta_destino)].append(nome)
+        else:
+            self.avulsos.append([origem, destino, acao] if acao else [origem, destino])
+        self.pendentes += 1
+        self.total += 1
+        if self.pendentes >= MOVIMENTOS_POR_LINHA:
+            self._descarregar()
+
+    def _descarregar(self):
+        linhas = [
+            {'op': self.numero, 'de': pasta_origem, 'para': pasta_destino, 'nomes': nomes}
+            for (pasta_origem, pasta_destino), nomes in self.grupos.items()
+        ]
+        if self.avulsos:
+            linhas.append({'op': self.numero, 'movimentos': self.avulsos})
+        for linha in linhas:
+            self.diario._acrescentar(linha)
+            self.linhas += 1
+            if self.linhas % LINHAS_POR_FSYNC == 0:
+                os.fsync(self.diario.fd)
+        self.grupos = defaultdict(list)
+        self.avulsos = []
+        self.pendentes = 0
+
+    def concluir(self):
+        """Grava os movimentos restantes, o fim da operação e a entrada no índice"""
+        self._descarregar()
+        with self.diario._travado():
+            fim = self.diario._acrescentar({'op': self.numero, 'fim': self.total})
+            os.fsync(self.diario.fd)
+            self.diario._indexar(self.numero, self.inicio, fim, ATIVA)
+        self.diario._liberar(self.numero)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        # Mesmo com erro os movimentos já feitos ficam registrados para poderem ser revertidos
+        self.concluir()
+        return False
+
+
+class Diario:
+    """Diário de operações do organizador com índice de deslocamentos (O(1) por operação)
+
+    Vários processos (ex: org.py e vigia_org.py) podem gravar no mesmo diário: as escritas passam por uma
+    trava no arquivo .lock e cada operação aberta mantém travado o próprio byte dele (1 + número).
+    """
+
+    def __init__(self, arquivo=ARQUIVO_DIARIO, arquivo_indice=ARQUIVO_INDICE):
+        self.arquivo = arquivo
+        self.arquivo_indice = arquivo_indice
+        novo = not os.path.exists(arquivo)
+        self.fd = os.open(arquivo, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        # Sem buffer: cada entrada vai direto para o arquivo (seek + read/write funcionam também no Windows)
+        self.indice = open(arquivo_indice, 'r+b' if os.path.exists(arquivo_indice) else 'w+b', buffering=0)
+        self.travas = os.open(f"{os.path.splitext(arquivo)[0]}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        # As travas de arquivo valem por processo: entre threads (sessões do Streamlit) vale esta
+        self._trava_local = threading.RLock()
+        self._nivel = 0
+        self._chave = os.path.realpath(arquivo)
+        with self._travado():
+            self._recuperar()
+        if novo and os.path.exists(LOG_ANTIGO):
+            self._importar_log_antigo()
+
+    def fechar(self):
+        os.close(self.fd)
+        self.indice.close()
+        os.close(self.travas)
+
+    def __len__(self):
+        return os.fstat(self.indice.fileno()).st_size // ENTRADA.size
+
+    @contextmanager
+    def _travado(self):
+        """Exclusão entre os processos e threads que gravam no diário (pode ser aninhado)"""
+        with self._trava_local:
+            if not self._nivel:
+                travar(self.travas, 0)
+            self._nivel += 1
+            try:
+                yield
+            finally:
+                self._nivel -= 1
+                if not self._nivel:
+                    destravar(self.travas, 0)
+
+    def _acrescentar(self, registro):
+        """Acrescenta uma linha ao diário; retorna a posição do fim da linha"""
+        with self._travado():
+            os.write(self.fd, (json.dumps(registro, ensure_ascii=False) + "\n").encode('utf-8'))
+            return os.lseek(self.fd, 0, os.SEEK_END)
+
+    def _entrada(self, numero):
+        with self._trava_local:
+            self.indice.seek(numero * ENTRADA.size)
+            return ENTRADA.unpack(self.indice.read(ENTRADA.size))
+
+    def _indexar(self, numero, inicio, fim, situacao):
+        with self._travado():
+            self.indice.seek(numero * ENTRADA.size)
+            self.indice.write(ENTRADA.pack(inicio, fim, situacao))
+
+    def _situacao(self, numero, situacao):
+        with self._travado():
+            self.indice.seek(numero * ENTRADA.size + ENTRADA.size - 1)
+            self.indice.write(bytes([situacao]))
+
+    def _liberar(self, numero):
+        """Solta a trava da operação concluída"""
+        _ABERTAS.discard((self._chave, numero))
+        destravar(self.travas, 1 + numero)
+
+    def _recuperar(self):
+        """Fecha as operações que ficaram abertas por um processo que caiu e acerta o índice com o diário"""
+        self.indice.truncate(len(self) * ENTRADA.size)
+        entradas = [self._entrada(numero) for numero in range(len(self))]
+        tamanho = os.fstat(self.fd).st_size
+        if any(max(inicio, fim) > tamanho for inicio, fim, _ in entradas):
+            # Índice de outro diário (ex: diário apagado): refaz do zero
+            self.indice.truncate(0)
+            entradas = []
+
+        # Depois do fim da última operação fechada só podem estar operações abertas e reversões
+        fim_indexado = max((fim for _, fim, situacao in entradas if situacao != ABERTA), default=0)
+        with open(self.arquivo, 'rb') as f:
+            f.seek(fim_indexado)
+            cauda = f.read()
+        # Linha cortada por uma queda no meio da escrita é descartada
+        completa = cauda.rfind(b"\n") + 1
+        if completa < len(cauda):
+            os.ftruncate(self.fd, fim_indexado + completa)
+        for linha in cauda[:completa].splitlines():
+            registro = json.loads(linha)
+            if 'revertida' in registro:
+                self._situacao(registro['revertida'], REVERTIDA)
+
+        for numero, (inicio, _, situacao) in enumerate(entradas):
+            if situacao != ABERTA or (self._chave, numero) in _ABERTAS:
+                continue
+            # Trava livre: o processo que abriu a operação não existe mais
+            if not travar(self.travas, 1 + numero, esperar=False):
+                continue
+            # Operação interrompida: fecha para os movimentos feitos poderem ser revertidos
+            fim = self._acrescentar({'op': numero, 'fim': None, 'interrompida': True})
+            os.fsync(self.fd)
+            self._indexar(numero, inicio, fim, ATIVA)
+            destravar(self.travas, 1 + numero)
+
+    def _importar_log_antigo(self):
+        """Copia as operações do organizador_log.json para o diário"""
+        with open(LOG_ANTIGO, 'r') as f:
+            log = json.load(f)
+        for antiga in log:
+            with self.iniciar(antiga['tipo'], antiga['pasta'], timestamp=antiga['timestamp']) as operacao:
+                for movimento in antiga['movimentos']:
+                    operacao.registrar(movimento['origem'], movimento['destino'])
+
+    def iniciar(self, tipo, pasta, timestamp=None):
+        """Abre uma operação no diário; use com `with` para ela ser concluída mesmo com erro"""
+        with self._travado():
+            # O número é a posição reservada no índice: dois processos nunca recebem o mesmo
+            numero = len(self)
+            travar(self.travas, 1 + numero)
+            _ABERTAS.add((self._chave, numero))
+            inicio = os.lseek(self.fd, 0, os.SEEK_END)
+            self._acrescentar({
+                'op': numero,
+                'tipo': tipo,
+                'pasta': pasta,
+                'timestamp': timestamp or datetime.now().isoformat(),
+            })
+            self._indexar(numero, inicio, 0, ABERTA)
+        return Operacao(self, numero, inicio)
+
+    def cabecalho(self, numero):
+        """Tipo, pasta e horário da operação (só a primeira linha dela é lida)"""
+        inicio, fim, situacao = self._entrada(numero)
+        with open(self.arquivo, 'rb') as f:
+            f.seek(inicio)
+            registro = json.loads(f.readline())
+        registro['situacao'] = situacao
+        return registro
+
+    def operacoes(self, limite=None):
+        """Operações ainda ativas, da mais recente para a mais antiga"""
+        encontradas = 0
+        for numero in range(len(self) - 1, -1, -1):
+            if limite is not None and encontradas >= limite:
+                break
+            if self._entrada(numero)[2] == ATIVA:
+                encontradas += 1
+                yield self.cabecalho(numero)
+
+    def ultima_ativa(self):
+        """Número da operação ativa mais recente ou None"""
+        ultima = next(self.operacoes(limite=1), None)
+        return ultima['op'] if ultima else None
+
+    def registros(self, numero):
+        """Lê as linhas de movimentos de uma operação como foram gravadas (agrupadas ou avulsas)"""
+        inicio, fim, _ = self._entrada(numero)
+        with open(self.arquivo, 'rb') as f:
+            f.seek(inicio)
+            while f.tell() < fim:
+                registro = json.loads(f.readline())
+                # Operações de outros processos gravadas ao mesmo tempo se intercalam com esta
+                if registro.get('op') == numero and ('nomes' in registro or 'movimentos' in registro):
+                    yield registro
+
+    def movimentos(self, numero):
+        """Lê os movimentos [origem, destino(, acao)] de uma operação, na ordem em que foram feitos"""
+        for registro in self.registros(numero):
+            if 'nomes' in registro:
+                for nome in registro['nomes']:
+                    yield [os.path.join(registro['de'], nome), os.path.join(registro['para'], nome)]
+            else:
+                yield from registro['movimentos']
+
+    def marcar_revertida(self, numero):
+        """Registra a reversão no diário e atualiza o índice no lugar"""
+        with self._travado():
+            self._acrescentar({'revertida': numero})
+            os.fsync(self.fd)
+            self._situacao(numero, REVERTIDA)
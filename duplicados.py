@@ -0,0 +1,113 @@
+import os
+import shutil
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from carregador import hash_arquivo
+from organizador import PASTA_DUPLICADOS, mover, varrer
+
+# Abaixo disso o hash é calculado aqui mesmo (subir processos custa mais que ganha)
+MINIMO_PARA_PROCESSOS = 32
+
+MODOS = ['mover', 'link']
+
+
+def _por_tamanho(pasta_origem, recursivo, ignorar):
+    """Agrupa os arquivos pelo tamanho; só grupos com mais de um arquivo podem ter duplicados
+
+    Hard links para o mesmo arquivo (ex: de um modo 'link' anterior) entram uma vez só:
+    não são lidos de novo nem viram duplicados.
+    """
+    grupos = defaultdict(list)
+    vistos = set()
+    for entrada in varrer(pasta_origem, recursivo, ignorar):
+        info = entrada.stat()
+        inode = (info.st_dev, info.st_ino)
+        if inode in vistos:
+            continue
+        vistos.add(inode)
+        # Arquivos vazios são todos "iguais" e não valem a pena
+        if info.st_size:
+            grupos[info.st_size].append((entrada.path, info.st_mtime))
+    return [grupo for grupo in grupos.values() if len(grupo) > 1]
+
+
+def encontrar_duplicados(pasta_origem, recursivo=False, ignorar=None, processos=None):
+    """Lista pares (duplicado, original) comparando o tamanho e depois o sha256 do conteúdo"""
+    candidatos = [arquivo for grupo in _por_tamanho(pasta_origem, recursivo, ignorar) for arquivo in grupo]
+    caminhos = [caminho for caminho, _ in candidatos]
+
+    # Só arquivos com o mesmo tamanho de outro são lidos; cada um em blocos (hash_arquivo)
+    if len(caminhos) < MINIMO_PARA_PROCESSOS:
+        hashes = [hash_arquivo(caminho) for caminho in caminhos]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            hashes = list(executor.map(hash_arquivo, caminhos, chunksize=16))
+
+    iguais = defaultdict(list)
+    for (caminho, mtime), sha256 in zip(candidatos, hashes):
+        iguais[sha256].append((mtime, len(os.path.basename(caminho)), caminho))
+
+    pares = []
+    for grupo in iguais.values():
+        if len(grupo) < 2:
+            continue
+        # Fica o mais antigo (e, no empate, o de nome mais curto: "doc.pdf" antes de "doc (1).pdf")
+        grupo.sort()
+        original = grupo[0][2]
+        pares.extend((caminho, original) for _, _, caminho in grupo[1:])
+    return pares
+
+
+def _linkar(duplicado, original):
+    """Troca o duplicado por um hard link para o original (o conteúdo passa a ser guardado uma vez)
+
+    Retorna False sem mexer em nada se os dois já são o mesmo arquivo.
+    """
+    if os.path.samefile(original, duplicado):
+        return False
+    temporario = f"{duplicado}.{uuid.uuid4().hex}.link.tmp"
+    os.link(original, temporario)
+    try:
+        os.replace(temporario, duplicado)
+    finally:
+        # rename entre dois nomes do mesmo arquivo não faz nada e deixaria o temporário para trás
+        if os.path.lexists(temporario):
+            os.unlink(temporario)
+    return True
+
+
+def tratar_duplicados(pasta_origem, operacao, modo='mover', recursivo=False, ignorar=None, processos=None):
+    """Move os duplicados para DUPLICADOS (ou troca por hard links) registrando tudo no diário
+
+    No diário, 'mover' fica como [duplicado, destino] e 'link' como [duplicado, original, 'link'].
+    Retorna quantos duplicados foram tratados.
+    """
+    pares = encontrar_duplicados(pasta_origem, recursivo, ignorar, processos)
+    pasta_duplicados = os.path.join(pasta_origem, PASTA_DUPLICADOS)
+    tratados = 0
+    for duplicado, original in pares:
+        if modo == 'link':
+            if not _linkar(duplicado, original):
+                continue
+            operacao.registrar(duplicado, original, 'link')
+        else:
+            # A estrutura de subpastas é mantida para nomes iguais em pastas diferentes não colidirem
+            destino = os.path.join(pasta_duplicados, os.path.relpath(duplicado, pasta_origem))
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            try:
+                mover(duplicado, destino)
+            except FileExistsError:
+                # Já há um arquivo com esse nome em DUPLICADOS (de uma execução anterior): fica onde está
+                continue
+            operacao.registrar(duplicado, destino)
+        tratados += 1
+    return tratados
+
+
+def desfazer_link(duplicado, original):
+    """Devolve ao duplicado uma cópia própria do conteúdo, desfazendo o hard link"""
+    temporario = f"{duplicado}.copia.tmp"
+    shutil.copy2(original, temporario)
+    os.replace(temporario, duplicado)
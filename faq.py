@@ -0,0 +1,423 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from carregador import hash_arquivo
+
+# Arrays da base gravados em disco; todos são abertos com mmap, sem cópia
+ARRAYS = [
+    'termos', 'frequencia', 'idf',
+    'postagens_dados', 'postagens_colunas', 'postagens_inicio',
+    'contagens_dados', 'contagens_colunas', 'contagens_inicio',
+    'respostas_bytes', 'respostas_inicio',
+]
+
+# Alterações pendentes (inclusões + remoções) que disparam o recálculo do idf:
+# o maior entre o mínimo e a fração das perguntas da base
+MINIMO_ATUALIZACAO = 50
+FRACAO_ATUALIZACAO = 0.1
+
+# Muda quando a tokenização muda: índices gravados com outra versão são recriados
+VERSAO_INDICE = 2
+
+
+def _vetorizador():
+    """Tokenizador do FAQ: sem acentos e minúsculo, como as chaves do cache de respostas"""
+    return CountVectorizer(strip_accents='unicode')
+
+
+def _idf(frequencia, n):
+    """idf suavizado, o mesmo do TfidfVectorizer"""
+    return np.log((1 + n) / (1 + np.asarray(frequencia, dtype=np.float64))) + 1
+
+
+def _gravar_json(caminho, dados):
+    """Grava um JSON de forma atômica"""
+    with open(f"{caminho}.tmp", 'w') as f:
+        json.dump(dados, f)
+    os.replace(f"{caminho}.tmp", caminho)
+
+
+def _terminar_linha(caminho):
+    """Garante a quebra de linha no fim do arquivo (CSV editado à mão pode terminar sem ela)"""
+    with open(caminho, 'rb+') as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) not in (b'\n', b'\r'):
+            f.write(b'\n')
+
+
+class Textos:
+    """Lista de textos guardada como um bloco UTF-8 e os deslocamentos de cada texto"""
+
+    def __init__(self, dados, inicio):
+        self.dados = dados
+        self.inicio = inicio
+
+    @classmethod
+    def de_lista(cls, textos):
+        """Codifica uma lista de textos no formato de bloco + deslocamentos"""
+        codificados = [str(t).encode('utf-8') for t in textos]
+        inicio = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in codificados], out=inicio[1:])
+        return cls(np.frombuffer(b''.join(codificados), dtype=np.uint8), inicio)
+
+    def __len__(self):
+        return len(self.inicio) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.dados[self.inicio[i]:self.inicio[i + 1]]).decode('utf-8')
+
+
+class IndiceFAQ:
+    """Índice invertido sobre os termos TF-IDF das perguntas do FAQ, com inclusão e remoção incrementais"""
+
+    def __init__(self, termos, frequencia, idf, contagens, postagens, respostas):
+        self.analisador = _vetorizador().build_analyzer()
+        self.origem = None
+        # Muda a cada inclusão, remoção ou recálculo (caches de respostas usam como chave)
+        self.versao = 0
+        # (mtime, tamanho) do CSV que corresponde ao índice
+        self.assinatura = None
+        self._definir_base(termos, frequencia, idf, contagens, postagens, respostas)
+
+    def _definir_base(self, termos, frequencia, idf, contagens, postagens, respostas):
+        """Troca a base do índice e zera as alterações pendentes"""
+        # Vocabulário em ordem alfabética: o id de um termo é a posição dele no array
+        self.termos = termos
+        # Perguntas x termos com as contagens brutas, usadas para recalcular o idf sem retokenizar
+        self.contagens = contagens
+        # Termos x perguntas em CSR: cada linha é a lista de perguntas que usam o termo
+        self.postagens = postagens
+        self.respostas = respostas
+
+        # Estado incremental: cópias em memória que crescem com as inclusões
+        self.frequencia = np.array(frequencia, dtype=np.int64)
+        self.idf = np.array(idf, dtype=np.float64)
+        self.novos_termos = {}
+        self.novas_contagens = sparse.csr_matrix((0, len(termos)), dtype=np.int64)
+        self.postagens_novas = sparse.csr_matrix((len(termos), 0))
+        self.novas_respostas = []
+        self.removidos = np.zeros(contagens.shape[0], dtype=bool)
+
+    @staticmethod
+    def _montar(termos, frequencia, contagens, respostas):
+        """Calcula idf e postagens a partir das contagens brutas"""
+        idf = _idf(frequencia, contagens.shape[0])
+        postagens = normalize(contagens.multiply(idf).tocsr()).T.tocsr()
+        return termos, frequencia, idf, contagens, postagens, respostas
+
+    @classmethod
+    def criar(cls, perguntas, respostas):
+        """Tokeniza as perguntas e monta o índice do zero"""
+        vectorizer = _vetorizador()
+        contagens = vectorizer.fit_transform(perguntas).tocsr()
+        # Cada linha CSR tem colunas únicas, então contar as colunas dá a frequência nos documentos
+        frequencia = np.bincount(contagens.indices, minlength=contagens.shape[1])
+        return cls(*cls._montar(
+            vectorizer.get_feature_names_out().astype(str),
+            frequencia,
+            contagens,
+            Textos.de_lista(respostas)
+        ))
+
+    @property
+    def n_termos(self):
+        return len(self.termos) + len(self.novos_termos)
+
+    @property
+    def n_base(self):
+        return self.contagens.shape[0]
+
+    def __len__(self):
+        return self.n_base + len(self.novas_respostas)
+
+    def resposta(self, i):
+        """Texto da resposta na posição i do índice"""
+        if i < self.n_base:
+            return self.respostas[i]
+        return self.novas_respostas[i - self.n_base]
+
+    def _ids(self, tokens, criar=False):
+        """Converte tokens em ids do vocabulário (-1 para termos desconhecidos)"""
+        todos = np.array(tokens, dtype=str)
+
+        # Busca binária no vocabulário ordenado da base
+        ids = np.searchsorted(self.termos, todos)
+        na_base = ids < len(self.termos)
+        na_base[na_base] = self.termos[ids[na_base]] == todos[na_base]
+        ids = np.where(na_base, ids, -1)
+
+        # Só os termos fora da base passam pelo dicionário dos termos novos
+        for i in np.flatnonzero(~na_base):
+            novo = self.novos_termos.get(tokens[i])
+            if novo is None and criar:
+                novo = self.novos_termos[tokens[i]] = self.n_termos
+            ids[i] = -1 if novo is None else novo
+        return ids
+
+    def _contar(self, perguntas, criar=False):
+        """Contagem de termos de cada pergunta, em CSR"""
+        tokens = [self.analisador(p) for p in perguntas]
+        linhas = np.repeat(np.arange(len(tokens)), [len(t) for t in tokens])
+        ids = self._ids([t for lista in tokens for t in lista], criar)
+        validos = ids >= 0
+        return sparse.csr_matrix(
+            (np.ones(validos.sum(), dtype=np.int64), (linhas[validos], ids[validos])),
+            shape=(len(tokens), self.n_termos)
+        )
+
+    def vetorizar(self, perguntas):
+        """Calcula o TF-IDF das consultas com o vocabulário e o idf do índice"""
+        return normalize(self._contar(perguntas).multiply(self.idf).tocsr())
+
+    def buscar(self, perguntas, k=1):
+        """Retorna os índices e os scores das k perguntas mais similares a cada consulta"""
+        consultas = self.vetorizar(perguntas)
+
+        # As linhas do TF-IDF já têm norma 1, então o produto é a similaridade de cosseno.
+        # O produto esparso só percorre as listas dos termos presentes na consulta.
+        similaridades = consultas[:, :len(self.termos)] @ self.postagens
+        if self.novas_respostas:
+            similaridades = sparse.hstack([similaridades, consultas @ self.postagens_novas])
+        similaridades = similaridades.tocoo()
+        linhas, colunas, scores = similaridades.row, similaridades.col, similaridades.data
+
+        if self.removidos.any():
+            ativos = ~self.removidos[colunas]
+            linhas, colunas, scores = linhas[ativos], colunas[ativos], scores[ativos]
+
+        # Ordena por consulta, score decrescente e índice (empate fica com o menor, como no argmax)
+        ordem = np.lexsort((colunas, -scores, linhas))
+        linhas, colunas, scores = linhas[ordem], colunas[ordem], scores[ordem]
+        inicio_linha = np.searchsorted(linhas, np.arange(consultas.shape[0]))
+        posicao = np.arange(len(linhas)) - inicio_linha[linhas]
+        manter = posicao < k
+
+        indices = np.full((consultas.shape[0], k), -1, dtype=np.int64)
+        valores = np.zeros((consultas.shape[0], k))
+        indices[linhas[manter], posicao[manter]] = colunas[manter]
+        valores[linhas[manter], posicao[manter]] = scores[manter]
+        return indices, valores
+
+    def _pendentes(self):
+        return len(self.novas_respostas) + int(self.removidos.sum())
+
+    def _incluir(self, novas, respostas, idf_novos=None):
+        """Acrescenta contagens já calculadas às perguntas pendentes"""
+        n_termos = self.n_termos
+        self.frequencia = np.concatenate([self.frequencia, np.zeros(n_termos - len(self.frequencia), dtype=np.int64)])
+        self.frequencia += np.bincount(novas.indices, minlength=n_termos)
+
+        # Termos novos recebem o idf com as contagens de agora; os demais esperam o recálculo
+        if idf_novos is None:
+            idf_novos = _idf(self.frequencia[len(self.idf):], len(self) + len(respostas) - self.removidos.sum())
+        self.idf = np.concatenate([self.idf, idf_novos])
+
+        self.novas_contagens.resize((self.novas_contagens.shape[0], n_termos))
+        self.novas_contagens = sparse.vstack([self.novas_contagens, novas]).tocsr()
+        self.postagens_novas = normalize(self.novas_contagens.multiply(self.idf).tocsr()).T.tocsr()
+        self.novas_respostas.extend(str(r) for r in respostas)
+        self.removidos = np.concatenate([self.removidos, np.zeros(len(respostas), dtype=bool)])
+
+    def adicionar(self, perguntas, respostas):
+        """Inclui perguntas sem revetorizar o corpus; retorna as posições delas no índice"""
+        inicio = len(self)
+        self._incluir(self._contar(perguntas, criar=True), respostas)
+
+        if self.origem:
+            arquivo_dados, _ = self.origem
+            # Sem isso a primeira pergunta nova grudaria na última linha e o índice deixaria de bater com o CSV
+            _terminar_linha(arquivo_dados)
+            pd.DataFrame({'Perguntas': perguntas, 'Respostas': respostas}).to_csv(
+                arquivo_dados, sep=";", mode='a', header=False, index=False
+            )
+        self._talvez_atualizar()
+        return list(range(inicio, inicio + len(perguntas)))
+
+    def remover(self, posicoes):
+        """Remove perguntas do índice pela posição retornada em buscar()"""
+        posicoes = np.unique(np.asarray(posicoes, dtype=np.int64))
+        posicoes = posicoes[~self.removidos[posicoes]]
+        if not len(posicoes):
+            return
+
+        # Linhas do CSV das perguntas ativas antes da remoção
+        linhas_csv = (np.cumsum(~self.removidos) - 1)[posicoes]
+
+        base, novas = posicoes[posicoes < self.n_base], posicoes[posicoes >= self.n_base] - self.n_base
+        colunas = np.concatenate([self.contagens[base].indices, self.novas_contagens[novas].indices])
+        self.frequencia -= np.bincount(colunas, minlength=len(self.frequencia))
+        self.removidos[posicoes] = True
+
+        if self.origem:
+            arquivo_dados, _ = self.origem
+            df = pd.read_csv(arquivo_dados, sep=";")
+            df.drop(index=df.index[linhas_csv]).to_csv(arquivo_dados, sep=";", index=False)
+        self._talvez_atualizar()
+
+    def _talvez_atualizar(self):
+        """Recalcula o idf quando as alterações pendentes passam do limite; senão só grava as pendências"""
+        self.versao += 1
+        if self._pendentes() > max(MINIMO_ATUALIZACAO, FRACAO_ATUALIZACAO * self.n_base):
+            self.atualizar_idf()
+        elif self.origem:
+            self._gravar_pendentes(self.origem[1])
+            self._gravar_manifesto(*self.origem)
+
+    def atualizar_idf(self):
+        """Incorpora as alterações pendentes à base e recalcula o idf, sem retokenizar as perguntas"""
+        self.versao += 1
+        # Mesmos arrays da base, só com as colunas dos termos novos (sem cópia)
+        base = sparse.csr_matrix(
+            (self.contagens.data, self.contagens.indices, self.contagens.indptr),
+            shape=(self.n_base, self.n_termos)
+        )
+        self.novas_contagens.resize((self.novas_contagens.shape[0], self.n_termos))
+        ativas = np.flatnonzero(~self.removidos)
+        contagens = sparse.vstack([base, self.novas_contagens]).tocsr()[ativas]
+
+        # Termos que ficaram sem perguntas saem; o vocabulário volta a ficar em ordem alfabética
+        todos_termos = np.concatenate([self.termos, np.array(list(self.novos_termos), dtype=str)])
+        com_perguntas = np.flatnonzero(self.frequencia > 0)
+        ordem = com_perguntas[np.argsort(todos_termos[com_perguntas], kind='stable')]
+
+        self._definir_base(*self._montar(
+            todos_termos[ordem],
+            self.frequencia[ordem],
+            contagens[:, ordem].tocsr(),
+            Textos.de_lista([self.resposta(i) for i in ativas])
+        ))
+        if self.origem:
+            self.salvar(*self.origem)
+
+    def _gravar_pendentes(self, pasta):
+        """Grava as alterações feitas desde o último recálculo do idf (arquivo pequeno)"""
+        _gravar_json(os.path.join(pasta, "pendentes.json"), {
+            'termos': list(self.novos_termos),
+            'idf': self.idf[len(self.termos):].tolist(),
+            'contagens_dados': self.novas_contagens.data.tolist(),
+            'contagens_colunas': self.novas_contagens.indices.tolist(),
+            'contagens_inicio': self.novas_contagens.indptr.tolist(),
+            'respostas': self.novas_respostas,
+            'removidos': np.flatnonzero(self.removidos).tolist(),
+        })
+
+    def _gravar_manifesto(self, arquivo_dados, pasta):
+        """Grava a assinatura do CSV que corresponde ao índice em disco"""
+        info = os.stat(arquivo_dados)
+        self.assinatura = (info.st_mtime_ns, info.st_size)
+        _gravar_json(os.path.join(pasta, "manifesto.json"), {
+            'mtime_ns': info.st_mtime_ns,
+            'tamanho': info.st_size,
+            'sha256': hash_arquivo(arquivo_dados),
+            'perguntas': self.n_base,
+            'termos': len(self.termos),
+            'versao': VERSAO_INDICE,
+        })
+
+    def salvar(self, arquivo_dados, pasta):
+        """Grava a base do índice como arrays .npy, as pendências e o manifesto"""
+        os.makedirs(pasta, exist_ok=True)
+        manifesto = os.path.join(pasta, "manifesto.json")
+        # Sem manifesto o índice é considerado inválido enquanto os arrays são trocados
+        if os.path.exists(manifesto):
+            os.remove(manifesto)
+
+        arrays = {
+            'termos': self.termos,
+            'frequencia': self.frequencia,
+            'idf': self.idf,
+            'postagens_dados': self.postagens.data,
+            'postagens_colunas': self.postagens.indices,
+            'postagens_inicio': self.postagens.indptr,
+            'contagens_dados': self.contagens.data,
+            'contagens_colunas': self.contagens.indices,
+            'contagens_inicio': self.contagens.indptr,
+            'respostas_bytes': self.respostas.dados,
+            'respostas_inicio': self.respostas.inicio,
+        }
+        for nome, array in arrays.items():
+            # Arquivo novo + os.replace: quem ainda tem o índice antigo em mmap não é afetado
+            destino = os.path.join(pasta, f"{nome}.npy")
+            with open(f"{destino}.tmp", 'wb') as f:
+                np.save(f, np.asarray(array))
+            os.replace(f"{destino}.tmp", destino)
+
+        self._gravar_pendentes(pasta)
+        self._gravar_manifesto(arquivo_dados, pasta)
+
+    @classmethod
+    def carregar(cls, pasta):
+        """Abre um índice gravado com salvar() via mmap; retorna também o manifesto"""
+        with open(os.path.join(pasta, "manifesto.json"), 'r') as f:
+            manifesto = json.load(f)
+        if manifesto.get('versao') != VERSAO_INDICE:
+            raise ValueError("índice gravado com outra tokenização")
+        a = {nome: np.load(os.path.join(pasta, f"{nome}.npy"), mmap_mode='r') for nome in ARRAYS}
+        n_perguntas, n_termos = manifesto['perguntas'], manifesto['termos']
+        indice = cls(
+            a['termos'],
+            a['frequencia'],
+            a['idf'],
+            sparse.csr_matrix(
+                (a['contagens_dados'], a['contagens_colunas'], a['contagens_inicio']),
+                shape=(n_perguntas, n_termos), copy=False
+            ),
+            sparse.csr_matrix(
+                (a['postagens_dados'], a['postagens_colunas'], a['postagens_inicio']),
+                shape=(n_termos, n_perguntas), copy=False
+            ),
+            Textos(a['respostas_bytes'], a['respostas_inicio'])
+        )
+
+        # Reaplica as alterações feitas depois do último recálculo do idf
+        with open(os.path.join(pasta, "pendentes.json"), 'r') as f:
+            pendentes = json.load(f)
+        if pendentes['respostas']:
+            indice.novos_termos = {t: n_termos + i for i, t in enumerate(pendentes['termos'])}
+            novas = sparse.csr_matrix(
+                (pendentes['contagens_dados'], pendentes['contagens_colunas'], pendentes['contagens_inicio']),
+                shape=(len(pendentes['respostas']), indice.n_termos), dtype=np.int64
+            )
+            indice._incluir(novas, pendentes['respostas'], np.array(pendentes['idf']))
+        if pendentes['removidos']:
+            removidos = np.array(pendentes['removidos'], dtype=np.int64)
+            base, novas = removidos[removidos < indice.n_base], removidos[removidos >= indice.n_base] - indice.n_base
+            colunas = np.concatenate([indice.contagens[base].indices, indice.novas_contagens[novas].indices])
+            indice.frequencia -= np.bincount(colunas, minlength=len(indice.frequencia))
+            indice.removidos[removidos] = True
+        return indice, manifesto
+
+    @classmethod
+    def abrir(cls, arquivo_dados, pasta):
+        """Usa o índice gravado se o CSV não mudou (mtime/tamanho ou sha256); senão recria"""
+        info = os.stat(arquivo_dados)
+        indice = gravado = None
+        if os.path.exists(os.path.join(pasta, "manifesto.json")):
+            try:
+                indice, gravado = cls.carregar(pasta)
+            except (OSError, KeyError, ValueError):
+                # Índice gravado em outro formato ou incompleto: recria
+                gravado = {'mtime_ns': None, 'tamanho': None, 'sha256': None}
+            mesmo_arquivo = gravado['mtime_ns'] == info.st_mtime_ns and gravado['tamanho'] == info.st_size
+            if not mesmo_arquivo and gravado['sha256'] == hash_arquivo(arquivo_dados):
+                # Arquivo foi tocado mas o conteúdo é o mesmo: só atualiza o manifesto
+                indice._gravar_manifesto(arquivo_dados, pasta)
+                mesmo_arquivo = True
+            if not mesmo_arquivo:
+                indice = None
+
+        if indice is None:
+            df = pd.read_csv(arquivo_dados, sep=";")
+            indice = cls.criar(df['Perguntas'], df['Respostas'])
+            indice.salvar(arquivo_dados, pasta)
+        indice.origem = (arquivo_dados, pasta)
+        indice.assinatura = (info.st_mtime_ns, info.st_size)
+        return indice
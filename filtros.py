@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+
+def ordenar_por_data(df, coluna):
+    """Ordena as linhas pela data usada no filtro de período (vazias no fim) e renumera o índice"""
+    # Índice 0..n-1 na ordem das datas: posição e rótulo da linha passam a ser a mesma coisa
+    return df.sort_values(coluna, kind='stable', na_position='last').reset_index(drop=True)
+
+
+def fatia_periodo(datas, inicio, fim):
+    """Linhas [i, j) com data entre inicio e fim (dias inteiros) por busca binária na coluna ordenada"""
+    valores = datas.to_numpy()
+    i = np.searchsorted(valores, np.datetime64(inicio, 'D'), side='left')
+    # Inclui o dia final inteiro, como o filtro de período do cubo
+    j = np.searchsorted(valores, np.datetime64(fim, 'D') + np.timedelta64(1, 'D'), side='left')
+    return int(i), int(max(i, j))
+
+
+
+class IndiceCategorias:
+    """Bitmaps (bits empacotados) com as linhas de cada valor das colunas filtradas por multiselect
+
+    Um multiselect vira o OR dos bitmaps dos valores escolhidos e os filtros, o AND dessas uniões.
+    """
+
+    # Uniões guardadas: quando só um widget muda, as dos outros são reaproveitadas
+    MAXIMO_UNIOES = 64
+
+    def __init__(self, df, colunas):
+        self.n = len(df)
+        self.bitmaps = {}
+        for coluna in colunas:
+            codigos, valores = pd.factorize(df[coluna], use_na_sentinel=False)
+            self.bitmaps[coluna] = {
+                self._chave(valor): np.packbits(codigos == i) for i, valor in enumerate(valores)
+            }
+        self.unioes = {}
+
+    @staticmethod
+    def _chave(valor):
+        # NaN != NaN: todos os vazios ficam na mesma chave
+        return None if pd.isna(valor) else valor
+
+    def uniao(self, coluna, valores):
+        """Bitmap das linhas com qualquer um dos valores na coluna"""
+        chave = (coluna, frozenset(self._chave(valor) for valor in valores))
+        bitmap = self.unioes.get(chave)
+        if bitmap is None:
+            bitmap = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+            for valor in chave[1]:
+                if valor in self.bitmaps[coluna]:
+                    bitmap |= self.bitmaps[coluna][valor]
+            if len(self.unioes) >= self.MAXIMO_UNIOES:
+                self.unioes.pop(next(iter(self.unioes)), None)
+            self.unioes[chave] = bitmap
+        return bitmap
+
+    def selecionar(self, filtros, inicio=0, fim=None):
+        """Posições das linhas em [inicio, fim) que atendem a todos os filtros {coluna: valores}"""
+        fim = self.n if fim is None else fim
+        # Só os bytes que cobrem a fatia do período entram no AND
+        primeiro, ultimo = inicio // 8, -(-fim // 8)
+        bits = None
+        for coluna, valores in filtros.items():
+            parte = self.uniao(coluna, valores)[primeiro:ultimo]
+            bits = parte if bits is None else bits & parte
+        if bits is None:
+            return np.arange(inicio, fim)
+        mascara = np.unpackbits(bits).view(bool)[inicio - 8 * primeiro:fim - 8 * primeiro]
+        return np.flatnonzero(mascara) + inicio
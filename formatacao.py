@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Troca os separadores do formato americano (1,234.56) pelos brasileiros (1.234,56) numa passada só
+_SEPARADORES_BR = str.maketrans(',.', '.,')
+
+
+def formatar_numero(valor, casas=0):
+    """Número no padrão brasileiro, ex: 1.234 ou 1.234,56"""
+    return f"{valor:,.{casas}f}".translate(_SEPARADORES_BR)
+
+
+def formatar_brl(valor, casas=2):
+    """Valor em reais, ex: R$ 1.234,56"""
+    return f"R$ {formatar_numero(valor, casas)}"
+
+
+def _caracteres_brl(centavos, casas, negativos):
+    """Monta os números como uma matriz de bytes ASCII (uma linha por valor, alinhada à direita), coluna a coluna"""
+    n = len(centavos)
+    inteiros = centavos // 10 ** casas
+    n_digitos = len(str(int(inteiros.max())))
+    # Dígitos da parte inteira de cada valor (1 para os menores que 10)
+    digitos = 1 + sum((inteiros >= 10 ** k).astype(np.int64) for k in range(1, n_digitos))
+    comprimento = digitos + (digitos - 1) // 3 + (casas + 1 if casas else 0) + negativos
+    largura = int(comprimento.max())
+
+    matriz = np.full((n, largura), ord(' '), dtype=np.uint8)
+    coluna = largura - 1
+    resto = centavos.copy()
+    for _ in range(casas):
+        matriz[:, coluna] = ord('0') + resto % 10
+        resto //= 10
+        coluna -= 1
+    if casas:
+        matriz[:, coluna] = ord(',')
+        coluna -= 1
+    for d in range(n_digitos):
+        if d and d % 3 == 0:
+            matriz[:, coluna] = np.where(d < digitos, ord('.'), ord(' '))
+            coluna -= 1
+        matriz[:, coluna] = np.where(d < digitos, ord('0') + resto % 10, ord(' '))
+        resto //= 10
+        coluna -= 1
+
+    # Sinal logo à esquerda do primeiro dígito
+    matriz[np.flatnonzero(negativos), (largura - comprimento)[negativos]] = ord('-')
+    return matriz
+
+
+def formatar_brl_serie(valores, casas=2, prefixo="R$ "):
+    """Formata a Series inteira no padrão brasileiro sem laço em Python por linha; vazios viram None"""
+    numeros = pd.to_numeric(valores, errors='coerce').to_numpy(dtype=float)
+    if not len(numeros):
+        return pd.Series([], index=valores.index, name=valores.name, dtype=object)
+    vazios = np.isnan(numeros)
+    centavos = np.round(np.abs(np.where(vazios, 0, numeros)) * 10 ** casas).astype(np.int64)
+    # Sem "-0,00" para valores que arredondam para zero
+    negativos = (numeros < 0) & (centavos > 0)
+
+    matriz = _caracteres_brl(centavos, casas, negativos)
+    textos = np.char.lstrip(matriz.view(f'S{matriz.shape[1]}').ravel()).astype(str)
+    if prefixo:
+        textos = np.char.add(prefixo, textos)
+    textos = textos.astype(object)
+    textos[vazios] = None
+    return pd.Series(textos, index=valores.index, name=valores.name)
+
+
+def coluna_brl(rotulo, **opcoes):
+    """Coluna numérica de reais para o column_config: o navegador formata e a coluna continua número"""
+    # "localized" segue o idioma do navegador (pt-BR: 1.234,56); ordenação e filtros continuam numéricos
+    return st.column_config.NumberColumn(rotulo, format="localized", **opcoes)
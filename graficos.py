@@ -0,0 +1,138 @@
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+# Figuras serializadas guardadas; cada uma tem de poucos KB a algumas centenas
+MAXIMO_FIGURAS = 256
+
+
+def normalizar_filtros(filtros):
+    """Estado dos filtros como chave estável; a ordem de seleção nos multiselects não importa"""
+    estado = []
+    for nome, valor in sorted(filtros.items()):
+        if isinstance(valor, (list, set, frozenset)):
+            valor = tuple(sorted(map(str, valor)))
+        elif isinstance(valor, tuple):
+            # Tuplas (ex: período do date_input) mantêm a ordem
+            valor = tuple(map(str, valor))
+        else:
+            valor = str(valor)
+        estado.append((nome, valor))
+    return tuple(estado)
+
+
+@st.cache_data(max_entries=MAXIMO_FIGURAS, show_spinner=False)
+def _json_figura(versao, filtros, grafico, _construir):
+    return _construir().to_json()
+
+
+def mostrar_figura(grafico, versao, filtros, construir, **opcoes):
+    """Mostra a figura guardada para (versão dos dados, filtros, gráfico); `construir` só roda na primeira vez"""
+    especificacao = _json_figura(versao, normalizar_filtros(filtros), grafico, construir)
+    # Já validada quando foi construída: remontar sem validar custa poucos milissegundos
+    st.plotly_chart(go.Figure(json.loads(especificacao), _validate=False), **opcoes)
+
+
+# Acima disso a dispersão vira WebGL com amostragem LTTB (pontos enviados ao navegador)
+LIMITE_PONTOS = 3000
+
+
+def lttb(x, y, n):
+    """Índices dos n pontos (n >= 3) que preservam a forma da série (Largest-Triangle-Three-Buckets); x crescente, sem NaN"""
+    total = len(x)
+    if n >= total:
+        return np.arange(total)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Primeiro e último ficam; o resto é dividido em n-2 baldes
+    limites = np.linspace(1, total - 1, n - 1).astype(int)
+    escolhidos = np.empty(n, dtype=int)
+    escolhidos[0], escolhidos[-1] = 0, total - 1
+    anterior = 0
+    for i in range(n - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        # Ponto médio do balde seguinte (o último balde usa o último ponto)
+        proximo = slice(fim, limites[i + 2]) if i + 2 < len(limites) else slice(total - 1, total)
+        mx, my = x[proximo].mean(), y[proximo].mean()
+        areas = np.abs(
+            (x[anterior] - mx) * (y[inicio:fim] - y[anterior]) - (x[anterior] - x[inicio:fim]) * (my - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[i + 1] = anterior
+    return escolhidos
+
+
+def dispersao_adaptativa(df, x, y, color=None, limite=LIMITE_PONTOS, **opcoes):
+    """px.scatter que, acima de `limite` linhas, usa WebGL e só os pontos escolhidos pelo LTTB em cada cor"""
+    # Linhas sem x ou y (ex: pedidos ainda não finalizados) o plotly não desenha; fora da amostra também
+    df = df.dropna(subset=[x, y])
+    if len(df) <= limite:
+        return px.scatter(df, x=x, y=y, color=color, **opcoes)
+
+    grupos = df.groupby(color, observed=True, sort=False) if color else [(None, df)]
+    partes = []
+    for _, grupo in grupos:
+        grupo = grupo.sort_values(x, kind='stable')
+        valores_x = grupo[x].to_numpy()
+        if np.issubdtype(valores_x.dtype, np.datetime64):
+            valores_x = valores_x.astype('datetime64[ns]').astype(np.int64)
+        # Cada cor recebe pontos na proporção das suas linhas
+        n = max(int(limite * len(grupo) / len(df)), 3)
+        partes.append(grupo.iloc[lttb(valores_x, grupo[y].to_numpy(), n)])
+    amostra = pd.concat(partes)
+
+    fig = px.scatter(amostra, x=x, y=y, color=color, render_mode='webgl', **opcoes)
+    titulo = opcoes.get('title')
+    if titulo:
+        fig.update_layout(title=f"{titulo} ({len(amostra)} de {len(df)} pontos)")
+    return fig
+
+
+def caixas_por_quantis(df, x, y, color=None, title=None, labels=None):
+    """Box plot montado a partir dos quartis e bigodes de cada grupo; o tamanho não depende das linhas"""
+    labels = labels or {}
+    chaves = [x] + ([color] if color else [])
+    valores = df[chaves + [y]].dropna(subset=[y])
+    fig = go.Figure()
+    fig.update_layout(
+        title=title,
+        boxmode='group' if color else 'overlay',
+        xaxis_title=labels.get(x, x),
+        yaxis_title=labels.get(y, y),
+        legend_title=labels.get(color, color) if color else None,
+    )
+    # Filtros sem nenhuma linha: gráfico vazio com os mesmos títulos (como o px.box)
+    if valores.empty:
+        return fig
+
+    grupos = valores.groupby(chaves, observed=True)[y]
+    resumo = grupos.quantile([0.25, 0.5, 0.75]).unstack()
+    resumo.columns = ['q1', 'mediana', 'q3']
+    resumo['media'] = grupos.mean()
+
+    # Bigodes como no px.box: valores mais extremos dentro de 1,5 IQR dos quartis
+    iqr = resumo['q3'] - resumo['q1']
+    cercas = pd.DataFrame({'minimo': resumo['q1'] - 1.5 * iqr, 'maximo': resumo['q3'] + 1.5 * iqr})
+    limites = cercas.reindex(pd.MultiIndex.from_frame(valores[chaves]) if color else valores[x]).to_numpy()
+    dentro = valores[(valores[y].to_numpy() >= limites[:, 0]) & (valores[y].to_numpy() <= limites[:, 1])]
+    bigodes = dentro.groupby(chaves, observed=True)[y]
+    resumo['inferior'] = bigodes.min()
+    resumo['superior'] = bigodes.max()
+    resumo = resumo.reset_index()
+
+    cores = px.colors.qualitative.Plotly
+    series = resumo.groupby(color, observed=True, sort=False) if color else [(None, resumo)]
+    for i, (nome, serie) in enumerate(series):
+        fig.add_trace(go.Box(
+            name=str(nome) if color else y,
+            x=serie[x].astype(str),
+            q1=serie['q1'], median=serie['mediana'], q3=serie['q3'], mean=serie['media'],
+            lowerfence=serie['inferior'], upperfence=serie['superior'],
+            marker_color=cores[i % len(cores)],
+            legendgroup=str(nome),
+        ))
+    return fig
@@ -0,0 +1,239 @@
+import glob
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+
+from carregador import PASTA_CACHE, gravar_atomico, ler_excel
+from diario import destravar, travar
+
+# Pasta da base consolidada (um ou mais arquivos Parquet por empresa)
+PASTA_BASE = os.path.join(PASTA_CACHE, "base_traducoes")
+MANIFESTO_BASE = os.path.join(PASTA_BASE, "manifesto.json")
+
+# Cada rerun do Streamlit é uma thread e vários dashboards atualizam a base: um de cada vez
+# (a trava local separa as threads; a do arquivo, os processos)
+ARQUIVO_TRAVA = os.path.join(PASTA_BASE, "base.lock")
+_trava_local = threading.Lock()
+
+# Muda quando `padronizar` passa a gerar outras linhas: as planilhas são reingeridas mesmo sem mudar
+VERSAO_PADRONIZACAO = 2
+
+# Esquema canônico da base consolidada
+ESQUEMA = pa.schema([
+    ('Empresa de tradução', pa.string()),
+    ('Tipo de Documento', pa.string()),
+    ('Data da solicitação', pa.timestamp('ns')),
+    ('Data de finalização', pa.timestamp('ns')),
+    ('IDIOMA', pa.string()),
+    ('TIPO DE TRADUÇÃO', pa.string()),
+    ('Qtde. de documentos/laudas', pa.int64()),
+    ('Valor unitário', pa.float64()),
+    ('Valor Total', pa.float64()),
+    ('_hash', pa.uint64()),
+])
+COLUNAS = [campo.name for campo in ESQUEMA if campo.name != '_hash']
+
+# Planilhas de cada empresa e como as colunas delas viram o esquema canônico
+FONTES = {
+    'BV TRADUÇÃO': {
+        'arquivo': "bv_traducoes_corrigida.xlsx",
+        'colunas': {},
+    },
+    'FATTO': {
+        'arquivo': "traducoes_FATTO_ALL.xlsx",
+        'colunas': {
+            'Data da finalização': 'Data de finalização',
+            'Quantidade de laudos': 'Qtde. de documentos/laudas',
+            'Preço unitário': 'Valor unitário',
+            'Valor total': 'Valor Total',
+        },
+    },
+    'IMPERA': {
+        'arquivo': "impera traduções totais.xlsx",
+        'colunas': {
+            'Atribuição': 'Data de finalização',
+            'Paginas': 'Qtde. de documentos/laudas',
+            'VALOR': 'Valor Total',
+        },
+    },
+}
+
+
+def _ler_manifesto():
+    """Carrega a versão da base e a assinatura das planilhas já ingeridas"""
+    try:
+        with open(MANIFESTO_BASE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'versao': 0, 'fontes': {}}
+
+
+def _gravar_manifesto(manifesto):
+    """Grava o manifesto de forma atômica"""
+    def escrever(destino):
+        with open(destino, 'w') as f:
+            json.dump(manifesto, f)
+    gravar_atomico(MANIFESTO_BASE, escrever)
+
+
+@contextmanager
+def _base_travada():
+    """Exclusão entre as threads e os processos que atualizam a base"""
+    with _trava_local:
+        fd = os.open(ARQUIVO_TRAVA, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            travar(fd, 0)
+            try:
+                yield
+            finally:
+                destravar(fd, 0)
+        finally:
+            os.close(fd)
+
+
+def _nome_empresa(empresa):
+    """Nome da empresa usado nos arquivos da base (ex: 'BV TRADUÇÃO' -> 'bv_tradução')"""
+    return re.sub(r'\W+', '_', empresa.lower())
+
+
+def _partes(empresa, manifesto):
+    """Lista os arquivos Parquet de uma empresa na ordem em que foram gravados"""
+    registro = manifesto['fontes'].get(empresa, {})
+    if 'partes' in registro:
+        return [os.path.join(PASTA_BASE, nome) for nome in registro['partes']]
+    # Manifesto antigo, de antes de as partes serem registradas nele
+    return sorted(glob.glob(os.path.join(PASTA_BASE, f"{_nome_empresa(empresa)}-*.parquet")))
+
+
+def partes_base():
+    """Arquivos Parquet que formam a base, segundo o manifesto (sobras de uma gravação interrompida ficam de fora)"""
+    manifesto = _ler_manifesto()
+    return sorted(p for empresa in manifesto['fontes'] for p in _partes(empresa, manifesto))
+
+
+def _remover_partes_soltas(manifesto):
+    """Apaga as partes que o manifesto não lista mais (compactadas ou de uma gravação interrompida)"""
+    validas = {p for empresa in manifesto['fontes'] for p in _partes(empresa, manifesto)}
+    for parte in glob.glob(os.path.join(PASTA_BASE, "*.parquet")):
+        if parte not in validas:
+            os.remove(parte)
+
+
+def padronizar(df, empresa, colunas):
+    """Converte a planilha de uma empresa para o esquema canônico"""
+    df = df.rename(columns=colunas).reindex(columns=COLUNAS)
+    df['Empresa de tradução'] = empresa
+
+    for coluna in ['Data da solicitação', 'Data de finalização']:
+        df[coluna] = pd.to_datetime(df[coluna])
+
+    # '1 documento', '1' e 1 viram o inteiro 1
+    qtde = df['Qtde. de documentos/laudas'].astype(str).str.replace(r'\D', '', regex=True)
+    df['Qtde. de documentos/laudas'] = pd.to_numeric(qtde, errors='coerce').fillna(0).astype('int64')
+
+    for coluna in ['Valor unitário', 'Valor Total']:
+        df[coluna] = pd.to_numeric(df[coluna], errors='coerce').astype('float64')
+    for coluna in ['Empresa de tradução', 'Tipo de Documento', 'IDIOMA', 'TIPO DE TRADUÇÃO']:
+        df[coluna] = df[coluna].astype(object).where(df[coluna].notna(), None)
+
+    # Linhas sem tipo de documento ficam fora da base, como na planilha TRADUÇÕES_GERAIS
+    df = df[df['Tipo de Documento'].notna() & df['Tipo de Documento'].astype(str).str.strip().ne('')].copy()
+
+    df['_hash'] = hash_linhas(df)
+    return df
+
+
+def hash_linhas(df):
+    """Hash do conteúdo de cada linha; linhas repetidas recebem também o número da ocorrência"""
+    conteudo = pd.util.hash_pandas_object(df[COLUNAS], index=False)
+    ocorrencia = conteudo.groupby(conteudo).cumcount()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({'conteudo': conteudo.values, 'ocorrencia': ocorrencia.values}),
+        index=False
+    ).values
+
+
+def _ingerir_fonte(empresa, df, manifesto):
+    """Grava só as linhas novas de uma empresa; retorna quantas linhas entraram e saíram
+
+    As partes trocadas só saem do manifesto aqui; os arquivos são apagados depois que ele é gravado.
+    """
+    partes = _partes(empresa, manifesto)
+    existentes = (
+        pd.concat([pd.read_parquet(p, columns=['_hash']) for p in partes])['_hash']
+        if partes else pd.Series([], dtype='uint64')
+    )
+    novas = df[~df['_hash'].isin(existentes)]
+    removidas = existentes[~existentes.isin(df['_hash'])]
+
+    if len(removidas):
+        # Linhas alteradas ou apagadas na planilha: compacta a empresa em uma parte só
+        atuais = pd.concat([pd.read_parquet(p) for p in partes])
+        atuais = pd.concat([atuais[atuais['_hash'].isin(df['_hash'])], novas])
+        novas, partes = atuais, []
+
+    registro = manifesto['fontes'].setdefault(empresa, {})
+    if len(novas):
+        sequencia = registro.get('sequencia', 0) + 1
+        destino = os.path.join(PASTA_BASE, f"{_nome_empresa(empresa)}-{sequencia:06d}.parquet")
+        gravar_atomico(destino, lambda temporario: novas.to_parquet(temporario, index=False, schema=ESQUEMA))
+        registro['sequencia'] = sequencia
+        partes = partes + [destino]
+    registro['partes'] = [os.path.basename(p) for p in partes]
+
+    return len(novas), len(removidas)
+
+
+def _atualizar(fontes):
+    """Corpo do atualizar_base, já com a base travada"""
+    manifesto = _ler_manifesto()
+    processou = mudou = False
+    reingerir = manifesto.get('padronizacao') != VERSAO_PADRONIZACAO
+
+    for empresa, fonte in fontes.items():
+        info = os.stat(fonte['arquivo'])
+        assinatura = [info.st_mtime_ns, info.st_size]
+        registro = manifesto['fontes'].get(empresa, {})
+        if registro.get('assinatura') == assinatura and not reingerir:
+            continue
+
+        df = padronizar(ler_excel(fonte['arquivo']), empresa, fonte['colunas'])
+        entraram, sairam = _ingerir_fonte(empresa, df, manifesto)
+        manifesto['fontes'].setdefault(empresa, {})['assinatura'] = assinatura
+        processou = True
+        mudou = mudou or bool(entraram or sairam)
+
+    if mudou:
+        manifesto['versao'] += 1
+    if processou:
+        manifesto['padronizacao'] = VERSAO_PADRONIZACAO
+        _gravar_manifesto(manifesto)
+        # Só com o manifesto novo gravado as partes antigas podem sair
+        _remover_partes_soltas(manifesto)
+    return manifesto['versao']
+
+
+def atualizar_base(fontes=FONTES):
+    """Ingere as planilhas que mudaram desde a última execução e retorna a versão da base"""
+    os.makedirs(PASTA_BASE, exist_ok=True)
+    # Leitura do manifesto, gravação das partes e limpeza das soltas numa seção só:
+    # ninguém apaga a parte que outro acabou de gravar e ainda não está no manifesto
+    with _base_travada():
+        return _atualizar(fontes)
+
+
+def carregar_base():
+    """Lê a base consolidada já tipada"""
+    partes = partes_base()
+    if not partes:
+        return pd.DataFrame({coluna: pd.Series(dtype=object) for coluna in COLUNAS})
+    return pd.concat([pd.read_parquet(p) for p in partes], ignore_index=True).drop(columns='_hash')
+
+
+if __name__ == "__main__":
+    print(f"Base de traduções na versão {atualizar_base()}")
@@ -0,0 +1,77 @@
+import os
+
+import pandas as pd
+
+from carregador import gravar_atomico
+from cubo import construir_cubo, somar_cubos
+from ingestao import ESQUEMA, PASTA_BASE, partes_base
+from normalizacao import normalizar_categoria, normalizar_tipo_documento, normalizar_tipo_traducao
+
+# Pasta dos agregados (separada para não ser lida como parte da base)
+PASTA_METRICAS = os.path.join(PASTA_BASE, "metricas")
+
+# Cada visão agrega a base pelas dimensões que o dashboard filtra e pela data usada no período
+VISOES = {
+    'geral': {
+        'dimensoes': ['Empresa de tradução', 'Tipo de Documento'],
+        'data': 'Data de finalização',
+    },
+    'empresa': {
+        'dimensoes': ['Empresa de tradução', 'Tipo de Documento', 'IDIOMA', 'TIPO DE TRADUÇÃO'],
+        'data': 'Data da solicitação',
+    },
+}
+
+NORMALIZADORES = {
+    'Tipo de Documento': normalizar_tipo_documento,
+    'IDIOMA': normalizar_categoria,
+    'TIPO DE TRADUÇÃO': normalizar_tipo_traducao,
+}
+
+
+def _agregar(df, dimensoes, coluna_data):
+    """Agrega linhas da base em somas e contagens por dimensões x dia"""
+    for coluna in dimensoes:
+        if coluna in NORMALIZADORES:
+            df[coluna] = NORMALIZADORES[coluna](df[coluna]).astype(object)
+
+    # Tempos negativos são erros de digitação e ficam fora da média
+    dias = (df['Data de finalização'] - df['Data da solicitação']).dt.days
+    df['Tempo de processamento (dias)'] = dias.where(dias >= 0)
+
+    return construir_cubo(
+        df, dimensoes, coluna_data, 'Valor Total', 'Tempo de processamento (dias)',
+        somas={'paginas': 'Qtde. de documentos/laudas'}
+    )
+
+
+def _agregar_parte(caminho, dimensoes, coluna_data):
+    """Agrega um arquivo da base"""
+    return _agregar(pd.read_parquet(caminho), dimensoes, coluna_data)
+
+
+def atualizar_metricas(visao):
+    """Soma aos agregados da visão só as partes novas da base e devolve o cubo consolidado"""
+    config = VISOES[visao]
+    arquivo = os.path.join(PASTA_METRICAS, f"{visao}.parquet")
+    partes = {os.path.basename(p) for p in partes_base()}
+
+    # Os agregados são guardados por parte: parte apagada na compactação sai, parte nova entra
+    agregado = pd.read_parquet(arquivo) if os.path.exists(arquivo) else None
+    incluidas = set(agregado['parte']) if agregado is not None else set()
+    novas = sorted(partes - incluidas)
+    removidas = incluidas - partes
+
+    if novas or removidas:
+        cubos = [agregado[agregado['parte'].isin(partes)]] if agregado is not None else []
+        for parte in novas:
+            cubo = _agregar_parte(os.path.join(PASTA_BASE, parte), config['dimensoes'], config['data'])
+            cubos.append(cubo.assign(parte=parte))
+        agregado = pd.concat(cubos, ignore_index=True)
+        os.makedirs(PASTA_METRICAS, exist_ok=True)
+        gravar_atomico(arquivo, lambda temporario: agregado.to_parquet(temporario, index=False))
+
+    if agregado is None or agregado.empty:
+        # Base ainda vazia: cubo sem células, mas com as colunas das medidas para totais() funcionar
+        return _agregar(ESQUEMA.empty_table().to_pandas(), config['dimensoes'], config['data'])
+    return somar_cubos([agregado.drop(columns='parte')], config['dimensoes'])
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# Mapeamento único para padronizar os tipos de documento (chaves já em minúsculas e sem espaços)
+MAPEAMENTO_DOCUMENTOS = {
+    'procura': 'procuração',
+    'procu': 'procuração',
+    'procuracao': 'procuração',
+    'cert': 'certidão',
+    'cert. italiana': 'certidão italiana',
+    'cert. objeto e pé': 'certidão objeto e pé',
+    'divorcio': 'divórcio',
+    'rec. paternidade': 'reconhecimento de paternidade',
+}
+
+# Categoria dos valores vazios: fica nas opções dos filtros e nenhuma linha some do padrão "todos"
+NAO_INFORMADO = 'não informado'
+
+# Mapeamento para padronizar o tipo de tradução
+MAPEAMENTO_TRADUCAO = {
+    'fisica': 'física',
+}
+
+
+def normalizar_categoria(serie, mapeamento=None):
+    """Padroniza os valores (minúsculas, sem espaços, mapeamento; vazios viram NAO_INFORMADO) e devolve uma coluna Categorical"""
+    mapeamento = mapeamento or {}
+
+    # A limpeza roda só sobre os valores distintos, não sobre cada linha
+    codigos, valores = pd.factorize(serie)
+    limpos = [mapeamento.get(v, v) or NAO_INFORMADO for v in (str(x).lower().strip() for x in valores)]
+    # Os vazios (código -1) pegam o último item da tabela, NAO_INFORMADO
+    if (codigos == -1).any():
+        limpos.append(NAO_INFORMADO)
+    categorias, novos_codigos = np.unique(np.array(limpos, dtype=object), return_inverse=True)
+
+    codigos = novos_codigos[codigos]
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categories=categorias),
+        index=serie.index,
+        name=serie.name
+    )
+
+
+def normalizar_tipo_documento(serie):
+    """Padroniza a coluna 'Tipo de Documento'"""
+    return normalizar_categoria(serie, MAPEAMENTO_DOCUMENTOS)
+
+
+def normalizar_tipo_traducao(serie):
+    """Padroniza a coluna 'TIPO DE TRADUÇÃO'"""
+    return normalizar_categoria(serie, MAPEAMENTO_TRADUCAO)
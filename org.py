@@ -1,170 +1,165 @@
 import os
-import shutil
-from datetime import datetime
+import pandas as pd
 import streamlit as st
-import json
 import time
 
-# Nome do arquivo de log
-LOG_FILE = "organizador_log.json"
+from diario import Diario
+from duplicados import tratar_duplicados
+from organizador import contar_arquivos, executar, pastas_ignoradas, planejar, resumir_plano
+from reversao import reverter_ate, reverter_operacao
 
-def carregar_log():
-    """Carrega o histórico de operações do arquivo de log"""
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, 'r') as f:
-            return json.load(f)
-    return []
+# Quantidade de operações recentes mostradas na sidebar
+HISTORICO_SIDEBAR = 20
 
-def salvar_log(operacao):
-    """Salva uma nova operação no arquivo de log"""
-    log = carregar_log()
-    log.append(operacao)
-    with open(LOG_FILE, 'w') as f:
-        json.dump(log, f)
+@st.cache_resource
+def abrir_diario():
+    """Abre o diário de operações (só acréscimo) usado para desfazer a organização"""
+    return Diario()
 
-def organizar_por_extensao(pasta_origem):
-    """Organiza arquivos por extensão (.pdf, .xlsx, etc.)"""
+# Opção escolhida na tela -> modo de tratar duplicados (None = não procura)
+TRATAMENTOS_DUPLICADOS = {
+    "Manter": None,
+    "Mover para a pasta DUPLICADOS": 'mover',
+    "Trocar por links (hard link)": 'link',
+}
+
+# Threads que varrem as subpastas do primeiro nível no modo recursivo
+TRABALHADORES_VARREDURA = 4
+
+# Critério escolhido na tela -> critério do organizador
+CRITERIOS = {
+    "Extensão": 'extensao',
+    "Data de modificação": 'data',
+}
+
+def organizar_pasta(pasta_origem, criterio, recursivo=False, duplicados=None):
+    """Executa o plano de organização mostrando o progresso arquivo a arquivo"""
     try:
-        total_arquivos = 0
-        operacao = {
-            'tipo': 'extensao',
-            'pasta': pasta_origem,
-            'timestamp': datetime.now().isoformat(),
-            'movimentos': []
-        }
-        
-        with st.spinner('Organizando por extensão...'):
-            for arquivo in os.listdir(pasta_origem):
-                caminho_completo = os.path.join(pasta_origem, arquivo)
-                if os.path.isfile(caminho_completo):
-                    extensao = os.path.splitext(arquivo)[1][1:]  # remove o ponto( .pdf -> pdf)
-                    if not extensao:  # para arquivos sem extensão
-                        extensao = "sem_extensao"
-                    pasta_destino = os.path.join(pasta_origem, extensao.upper())
-                    os.makedirs(pasta_destino, exist_ok=True)
-                    destino_final = os.path.join(pasta_destino, arquivo)
-                    shutil.move(caminho_completo, destino_final)
-                    
-                    # Registra o movimento
-                    operacao['movimentos'].append({
-                        'origem': caminho_completo,
-                        'destino': destino_final
-                    })
-                    total_arquivos += 1
+        with abrir_diario().iniciar(criterio, pasta_origem) as operacao:
+            # Duplicados saem antes para não serem organizados junto (ficam na mesma operação do diário)
+            if duplicados:
+                with st.spinner('Procurando arquivos duplicados...'):
+                    n_duplicados = tratar_duplicados(
+                        pasta_origem, operacao, duplicados, recursivo, pastas_ignoradas(criterio)
+                    )
+                st.info(f"{n_duplicados} arquivos duplicados {'movidos para DUPLICADOS' if duplicados == 'mover' else 'trocados por links'}.")
+            
+            total = contar_arquivos(pasta_origem, recursivo, criterio)
+            barra = st.progress(0.0, text=f"Organizando {total} arquivos...")
+            # Clicar interrompe a execução; o que já foi movido fica no diário e pode ser revertido
+            st.button("⏹️ Cancelar")
+            
+            plano = planejar(pasta_origem, criterio, recursivo, trabalhadores=TRABALHADORES_VARREDURA)
+            for progresso in executar(plano, operacao):
+                feitos = progresso['movidos'] + progresso['pulados']
+                barra.progress(min(feitos / max(total, 1), 1.0), text=f"{progresso['movidos']} de {total} arquivos movidos")
         
-        salvar_log(operacao)
-        st.success(f"✅ Organização concluída! {total_arquivos} arquivos movidos.")
+        st.success(f"✅ Organização concluída! {progresso['movidos']} arquivos movidos.")
+        if progresso['pulados']:
+            st.warning(f"{progresso['pulados']} arquivos não foram movidos porque já existem no destino.")
         return True
     except Exception as e:
-        st.error(f"❌ Erro ao organizar por extensão: {e}")
+        st.error(f"❌ Erro ao organizar: {e}")
         return False
 
-def organizar_por_data(pasta_origem):
+def organizar_por_extensao(pasta_origem, recursivo=False, duplicados=None):
+    """Organiza arquivos por extensão (.pdf, .xlsx, etc.)"""
+    return organizar_pasta(pasta_origem, 'extensao', recursivo, duplicados)
+
+def organizar_por_data(pasta_origem, recursivo=False, duplicados=None):
     """Organiza arquivos por ano-mês (ex: 2024-07)"""
-    try:
-        total_arquivos = 0
-        operacao = {
-            'tipo': 'data',
-            'pasta': pasta_origem,
-            'timestamp': datetime.now().isoformat(),
-            'movimentos': []
-        }
-        
-        with st.spinner('Organizando por data...'):
-            for arquivo in os.listdir(pasta_origem):
-                caminho_completo = os.path.join(pasta_origem, arquivo)
-                if os.path.isfile(caminho_completo):
-                    data_modificacao = os.path.getmtime(caminho_completo)
-                    data = datetime.fromtimestamp(data_modificacao).strftime("%Y-%m")
-                    pasta_destino = os.path.join(pasta_origem, data)
-                    os.makedirs(pasta_destino, exist_ok=True)
-                    destino_final = os.path.join(pasta_destino, arquivo)
-                    shutil.move(caminho_completo, destino_final)
-                    
-                    # Registra o movimento
-                    operacao['movimentos'].append({
-                        'origem': caminho_completo,
-                        'destino': destino_final
-                    })
-                    total_arquivos += 1
-        
-        salvar_log(operacao)
-        st.success(f"✅ Organização concluída! {total_arquivos} arquivos movidos.")
-        return True
-    except Exception as e:
-        st.error(f"❌ Erro ao organizar por data: {e}")
-        return False
+    return organizar_pasta(pasta_origem, 'data', recursivo, duplicados)
 
-def reverter_ultima_operacao():
-    """Reverte a última operação de organização"""
-    log = carregar_log()
-    if not log:
+def mostrar_plano(pasta_origem, criterio, recursivo=False):
+    """Pré-visualiza o que a organização faria, sem mover nada"""
+    with st.spinner('Planejando...'):
+        plano = planejar(pasta_origem, criterio, recursivo, trabalhadores=TRABALHADORES_VARREDURA)
+        resumo, primeiros = resumir_plano(plano)
+    
+    if not resumo:
+        st.info("Nenhum arquivo para organizar.")
+        return
+    
+    tabela = pd.DataFrame.from_dict(resumo, orient='index')
+    tabela.index = [os.path.relpath(pasta, pasta_origem) for pasta in tabela.index]
+    tabela['MB'] = (tabela.pop('bytes') / 1024 ** 2).round(2)
+    st.write(f"**{tabela['arquivos'].sum()} arquivos** para {len(tabela)} pastas:")
+    st.dataframe(tabela.sort_values('arquivos', ascending=False))
+    
+    if tabela['conflitos'].any():
+        st.warning(f"{tabela['conflitos'].sum()} arquivos já existem no destino e serão pulados.")
+    with st.expander(f"Primeiros {len(primeiros)} movimentos"):
+        st.dataframe(pd.DataFrame(primeiros, columns=['origem', 'destino', 'tamanho', 'conflito']))
+
+def reverter_operacoes(numero=None):
+    """Reverte a última operação ou, com `numero`, todas as operações desde ela"""
+    diario = abrir_diario()
+    ultima = diario.ultima_ativa()
+    if ultima is None:
         st.warning("Não há operações para reverter.")
         return False
     
-    ultima_operacao = log[-1]
-    
     try:
-        with st.spinner('Revertendo última operação...'):
-            # Reverte na ordem inversa para evitar conflitos
-            for movimento in reversed(ultima_operacao['movimentos']):
-                if os.path.exists(movimento['destino']):
-                    shutil.move(movimento['destino'], movimento['origem'])
-            
-            # Remove a operação do log
-            log.pop()
-            with open(LOG_FILE, 'w') as f:
-                json.dump(log, f)
-            
-            # Remove pastas vazias criadas na organização
-            if ultima_operacao['tipo'] == 'extensao':
-                for movimento in ultima_operacao['movimentos']:
-                    pasta = os.path.dirname(movimento['destino'])
-                    if os.path.exists(pasta) and not os.listdir(pasta):
-                        os.rmdir(pasta)
-            elif ultima_operacao['tipo'] == 'data':
-                for movimento in ultima_operacao['movimentos']:
-                    pasta = os.path.dirname(movimento['destino'])
-                    if os.path.exists(pasta) and not os.listdir(pasta):
-                        os.rmdir(pasta)
+        with st.spinner('Revertendo operações...'):
+            if numero is None:
+                restaurados, ignorados = reverter_operacao(diario, ultima)
+            else:
+                restaurados, ignorados = reverter_ate(diario, numero)
         
-        st.success(f"✅ Operação revertida com sucesso!")
+        st.success(f"✅ Operação revertida com sucesso! {restaurados} arquivos restaurados.")
+        if ignorados:
+            st.warning(f"{ignorados} arquivos não estavam mais no destino ou já existiam na origem e ficaram onde estão.")
         return True
     except Exception as e:
         st.error(f"❌ Erro ao reverter operação: {e}")
         return False
 
+def reverter_ultima_operacao():
+    """Reverte a última operação de organização"""
+    return reverter_operacoes()
+
 def main():
     st.title("📁 Organizador de Arquivos (com Reversão)")
     st.write("""
     Este aplicativo organiza seus arquivos automaticamente por extensão ou data de modificação.
-    Você pode reverter a última operação se necessário.
+    Você pode reverter a última operação, ou voltar o histórico até uma operação anterior, se necessário.
     """)
     
     # Sidebar com histórico e reversão
     with st.sidebar:
         st.subheader("Histórico de Operações")
-        log = carregar_log()
+        recentes = list(abrir_diario().operacoes(limite=HISTORICO_SIDEBAR))
         
-        if not log:
+        if not recentes:
             st.write("Nenhuma operação registrada.")
         else:
-            for i, op in enumerate(reversed(log), 1):
+            for i, op in enumerate(recentes, 1):
                 st.write(f"{i}. {op['tipo'].capitalize()} - {op['timestamp']}")
         
-        if st.button("↩️ Reverter Última Operação", disabled=not log):
+        if st.button("↩️ Reverter Última Operação", disabled=not recentes):
             if reverter_ultima_operacao():
                 st.rerun()
+        
+        if len(recentes) > 1:
+            # Volta o histórico até o ponto escolhido (reverte da mais nova até ela, inclusive)
+            escolhida = st.selectbox(
+                "Reverter até a operação:",
+                recentes,
+                format_func=lambda op: f"{op['tipo'].capitalize()} - {op['timestamp']}"
+            )
+            if st.button("⏪ Reverter até aqui"):
+                if reverter_operacoes(escolhida['op']):
+                    st.rerun()
     
     # Área principal
     with st.expander("ℹ️ Como usar"):
         st.write("""
         1. Selecione a pasta que deseja organizar
         2. Escolha o critério de organização
-        3. Clique em "Organizar Arquivos"
+        3. Clique em "Pré-visualizar" para conferir o plano e em "Organizar Arquivos" para executar
         4. Se necessário, reverta a operação na sidebar
         
-        **Dica:** A reversão só funciona para a última operação realizada.
+        **Dica:** Na sidebar dá para reverter a última operação ou voltar até qualquer operação do histórico.
         """)
     
     pasta = st.text_input("Digite o caminho completo da pasta a ser organizada:")
@@ -178,16 +173,31 @@ def main():
         horizontal=True
     )
     
-    if st.button("Organizar Arquivos", type="primary"):
+    recursivo = st.checkbox(
+        "Incluir subpastas",
+        help="Organiza também as subpastas, cada uma dentro dela mesma. Pastas de destino (PDF, 2024-07...) são ignoradas."
+    )
+    
+    # Arquivos com conteúdo idêntico (mesmo PDF salvo várias vezes)
+    tratamento_duplicados = st.selectbox(
+        "Arquivos duplicados:",
+        list(TRATAMENTOS_DUPLICADOS),
+        help="Compara o tamanho e depois o conteúdo (sha256). O arquivo mais antigo é mantido; tudo pode ser revertido."
+    )
+    
+    col1, col2 = st.columns(2)
+    pre_visualizar = col1.button("🔍 Pré-visualizar")
+    organizar_arquivos = col2.button("Organizar Arquivos", type="primary")
+    
+    if pre_visualizar or organizar_arquivos:
         if not pasta:
             st.warning("Por favor, informe o caminho da pasta.")
         elif not os.path.isdir(pasta):
             st.warning("A pasta especificada não existe.")
+        elif pre_visualizar:
+            mostrar_plano(pasta, CRITERIOS[criterio], recursivo)
         else:
-            if criterio == "Extensão":
-                organizar_por_extensao(pasta)
-            else:
-                organizar_por_data(pasta)
+            organizar_pasta(pasta, CRITERIOS[criterio], recursivo, TRATAMENTOS_DUPLICADOS[tratamento_duplicados])
             time.sleep(1)
             st.rerun()
 
@@ -0,0 +1,325 @@
+import errno
+import os
+import queue
+import re
+import shutil
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+# Threads que executam os movimentos e arquivos por tarefa (uma tarefa só mexe em uma pasta de destino)
+TRABALHADORES = 8
+ARQUIVOS_POR_TAREFA = 512
+
+# Item do plano: conflito indica que já existe um arquivo com o mesmo nome no destino
+Movimento = namedtuple('Movimento', ['origem', 'destino', 'tamanho', 'conflito'])
+
+
+def pasta_por_extensao(entrada):
+    """Pasta de destino pela extensão (.pdf -> PDF, sem extensão -> SEM_EXTENSAO)"""
+    extensao = os.path.splitext(entrada.name)[1][1:]  # remove o ponto( .pdf -> pdf)
+    if not extensao:  # para arquivos sem extensão
+        extensao = "sem_extensao"
+    return extensao.upper()
+
+
+def pasta_por_data(entrada):
+    """Pasta de destino pelo ano-mês de modificação (ex: 2024-07)"""
+    # entrada.stat() reaproveita o que o scandir já leu quando o sistema fornece
+    return datetime.fromtimestamp(entrada.stat().st_mtime).strftime("%Y-%m")
+
+
+REGRAS = {
+    'extensao': pasta_por_extensao,
+    'data': pasta_por_data,
+}
+
+# Nomes de pasta que cada regra cria; no modo recursivo essas pastas não são percorridas
+# (por extensão o nome só pré-filtra: veja _pasta_de_extensao)
+PASTAS_DESTINO = {
+    'extensao': re.compile(r'[A-Z0-9_]*[A-Z][A-Z0-9_]*'),
+    'data': re.compile(r'\d{4}-\d{2}'),
+}
+
+# Pasta (no nível de cima) para onde vão os arquivos duplicados; nunca é organizada
+PASTA_DUPLICADOS = "DUPLICADOS"
+
+# Hard link do próprio symlink, não do arquivo para onde ele aponta (onde o sistema permite escolher)
+_LINK_SEM_SEGUIR = {'follow_symlinks': False} if os.link in os.supports_follow_symlinks else {}
+
+# Itens do plano aguardando na fila quando as subpastas são varridas em paralelo
+TAMANHO_FILA_PLANO = 4096
+
+
+def varrer(pasta, recursivo=False, ignorar=None):
+    """Gera as entradas de arquivo pasta por pasta (todos os arquivos de uma pasta antes das subpastas)
+
+    A memória depende só da profundidade e da quantidade de subpastas, nunca da de arquivos.
+    """
+    pilha = [pasta]
+    while pilha:
+        subpastas = []
+        with os.scandir(pilha.pop()) as entradas:
+            for entrada in entradas:
+                if entrada.is_file():
+                    yield entrada
+                elif recursivo and entrada.is_dir(follow_symlinks=False):
+                    if ignorar is None or not ignorar(entrada):
+                        subpastas.append(entrada.path)
+        pilha.extend(reversed(subpastas))
+
+
+def _pasta_de_extensao(entrada):
+    """Pasta criada pela organização por extensão: só tem arquivos com a extensão do nome dela"""
+    # Pastas do usuário em maiúsculas (CLIENTES, RH) têm outros arquivos ou subpastas e continuam sendo organizadas
+    with os.scandir(entrada.path) as conteudo:
+        return all(item.is_file() and pasta_por_extensao(item) == entrada.name for item in conteudo)
+
+
+def pastas_ignoradas(criterio):
+    """Função que diz se uma subpasta (entrada do scandir) não deve ser percorrida no modo recursivo"""
+    padrao = PASTAS_DESTINO[criterio]
+
+    def ignorar(entrada):
+        if entrada.name == PASTA_DUPLICADOS:
+            return True
+        if not padrao.fullmatch(entrada.name):
+            return False
+        return criterio != 'extensao' or _pasta_de_extensao(entrada)
+    return ignorar
+
+
+def contar_arquivos(pasta_origem, recursivo=False, criterio=None):
+    """Quantidade de arquivos que a organização vai percorrer (para a barra de progresso)"""
+    ignorar = pastas_ignoradas(criterio) if criterio else None
+    return sum(1 for _ in varrer(pasta_origem, recursivo, ignorar))
+
+
+def _planejar_arvore(pasta, regra, ignorar, recursivo):
+    """Plano de uma pasta (e subpastas): cada arquivo vai para a pasta de destino dentro da própria pasta"""
+    existentes = {}
+    pasta_atual = None
+    for entrada in varrer(pasta, recursivo, ignorar):
+        pasta_arquivo = os.path.dirname(entrada.path)
+        if pasta_arquivo != pasta_atual:
+            # Mudou de pasta: os nomes dos destinos anteriores não são mais necessários
+            existentes.clear()
+            pasta_atual = pasta_arquivo
+
+        pasta_destino = os.path.join(pasta_arquivo, regra(entrada))
+        # Nomes já presentes em cada destino são lidos uma vez, na primeira vez que ele aparece
+        if pasta_destino not in existentes:
+            existentes[pasta_destino] = set(os.listdir(pasta_destino)) if os.path.isdir(pasta_destino) else set()
+        yield Movimento(
+            entrada.path,
+            os.path.join(pasta_destino, entrada.name),
+            entrada.stat().st_size,
+            entrada.name in existentes[pasta_destino]
+        )
+
+
+def _planejar_em_paralelo(pasta_origem, regra, ignorar, trabalhadores):
+    """Varre cada subpasta do primeiro nível em uma thread; a fila limitada segura a memória"""
+    fila = queue.Queue(maxsize=TAMANHO_FILA_PLANO)
+    parar = threading.Event()
+    fim = object()
+
+    def colocar(item):
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def planejar_subpasta(subpasta):
+        try:
+            for movimento in _planejar_arvore(subpasta, regra, ignorar, True):
+                if not colocar(movimento):
+                    return
+        except OSError as erro:
+            colocar(erro)
+        finally:
+            colocar(fim)
+
+    with os.scandir(pasta_origem) as entradas:
+        subpastas = [
+            entrada.path for entrada in entradas
+            if entrada.is_dir(follow_symlinks=False) and not ignorar(entrada)
+        ]
+
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        for subpasta in subpastas:
+            executor.submit(planejar_subpasta, subpasta)
+        try:
+            # Arquivos do primeiro nível são planejados aqui enquanto as threads varrem as subpastas
+            yield from _planejar_arvore(pasta_origem, regra, ignorar, False)
+            restantes = len(subpastas)
+            while restantes:
+                item = fila.get()
+                if item is fim:
+                    restantes -= 1
+                elif isinstance(item, OSError):
+                    raise item
+                else:
+                    yield item
+        finally:
+            parar.set()
+
+
+def planejar(pasta_origem, criterio, recursivo=False, trabalhadores=1):
+    """Gera o plano de movimentos em uma única varredura, sem montar a lista inteira na memória
+
+    No modo recursivo cada subpasta é organizada dentro dela mesma; as pastas de destino
+    (PDF, 2024-07...) não são percorridas. Com trabalhadores > 1 as subpastas do primeiro
+    nível são varridas em paralelo.
+    """
+    regra = REGRAS[criterio]
+    ignorar = pastas_ignoradas(criterio)
+    if recursivo and trabalhadores > 1:
+        return _planejar_em_paralelo(pasta_origem, regra, ignorar, trabalhadores)
+    return _planejar_arvore(pasta_origem, regra, ignorar, recursivo)
+
+
+def resumir_plano(plano, amostra=100):
+    """Resumo do plano por pasta de destino e os primeiros movimentos, para pré-visualização"""
+    resumo = defaultdict(lambda: {'arquivos': 0, 'bytes': 0, 'conflitos': 0})
+    primeiros = []
+    for movimento in plano:
+        pasta = resumo[os.path.dirname(movimento.destino)]
+        pasta['arquivos'] += 1
+        pasta['bytes'] += movimento.tamanho
+        pasta['conflitos'] += movimento.conflito
+        if len(primeiros) < amostra:
+            primeiros.append(movimento)
+    return dict(resumo), primeiros
+
+
+def _substituir(origem, destino):
+    """Move com um único rename quando origem e destino estão no mesmo sistema de arquivos"""
+    try:
+        os.replace(origem, destino)
+    except OSError as erro:
+        if erro.errno != errno.EXDEV:
+            raise
+        shutil.move(origem, destino)
+
+
+def mover(origem, destino, substituir=False):
+    """Move o arquivo; sem substituir, um destino que já existe dá FileExistsError em vez de ser sobrescrito
+
+    O conflito do plano é visto antes da execução: um arquivo com o mesmo nome pode chegar ao destino
+    nesse meio tempo (ex: no vigia_org). O link falha se o destino existe, o rename não.
+    """
+    if substituir:
+        _substituir(origem, destino)
+        return
+    try:
+        os.link(origem, destino, **_LINK_SEM_SEGUIR)
+    except FileExistsError:
+        raise
+    except OSError:
+        # Outro disco ou sistema de arquivos sem hard links: confere antes de mover
+        if os.path.lexists(destino):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destino)
+        _substituir(origem, destino)
+    else:
+        os.unlink(origem)
+
+
+def _mover_lote(movimentos, substituir):
+    """Executa uma lista de movimentos; retorna os feitos, quantos foram pulados e o erro, se houver"""
+    feitos = []
+    pulados = 0
+    try:
+        for movimento in movimentos:
+            try:
+                mover(movimento.origem, movimento.destino, substituir)
+            except FileExistsError:
+                # Apareceu no destino depois do plano
+                pulados += 1
+                continue
+            feitos.append(movimento)
+    except OSError as erro:
+        return feitos, pulados, erro
+    return feitos, pulados, None
+
+
+def executar(plano, operacao, trabalhadores=TRABALHADORES, parar=None, substituir=False):
+    """Aplica o plano emitindo o progresso a cada lote concluído
+
+    Arquivos em conflito (no plano ou que chegaram ao destino depois dele) são pulados, a menos que
+    substituir=True. `parar` (threading.Event)
+    interrompe a execução entre lotes; fechar o gerador também interrompe. Em todos os casos os
+    movimentos já feitos ficam registrados na operação do diário.
+    """
+    progresso = {'movidos': 0, 'pulados': 0, 'bytes': 0, 'erro': None}
+    pendentes = defaultdict(list)
+    criadas = set()
+    em_andamento = set()
+
+    def concluir(tarefas):
+        # O diário é gravado só nesta thread, à medida que as tarefas terminam
+        for tarefa in tarefas:
+            em_andamento.discard(tarefa)
+            feitos, pulados, erro = tarefa.result()
+            for movimento in feitos:
+                operacao.registrar(movimento.origem, movimento.destino)
+                progresso['bytes'] += movimento.tamanho
+            progresso['movidos'] += len(feitos)
+            progresso['pulados'] += pulados
+            progresso['erro'] = progresso['erro'] or erro
+
+    def enviar(executor, lote):
+        pasta_destino = os.path.dirname(lote[0].destino)
+        # Cada pasta de destino é criada uma vez só
+        if pasta_destino not in criadas:
+            os.makedirs(pasta_destino, exist_ok=True)
+            criadas.add(pasta_destino)
+        em_andamento.add(executor.submit(_mover_lote, lote, substituir))
+
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        try:
+            for movimento in plano:
+                if parar is not None and parar.is_set() or progresso['erro']:
+                    break
+                if movimento.conflito and not substituir:
+                    progresso['pulados'] += 1
+                    continue
+
+                lote = pendentes[os.path.dirname(movimento.destino)]
+                lote.append(movimento)
+                if len(lote) >= ARQUIVOS_POR_TAREFA:
+                    enviar(executor, pendentes.pop(os.path.dirname(movimento.destino)))
+                    # Poucas tarefas na fila: a memória não cresce com o tamanho da pasta
+                    if len(em_andamento) >= 2 * trabalhadores:
+                        wait(em_andamento, return_when=FIRST_COMPLETED)
+                    concluidas = [tarefa for tarefa in em_andamento if tarefa.done()]
+                    if concluidas:
+                        concluir(concluidas)
+                        yield dict(progresso)
+            else:
+                for lote in pendentes.values():
+                    enviar(executor, lote)
+
+            while em_andamento:
+                concluidas, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+                concluir(concluidas)
+                yield dict(progresso)
+        finally:
+            # Execução interrompida: espera os lotes em andamento para registrá-los também
+            concluir(list(em_andamento))
+
+    if progresso['erro']:
+        raise progresso['erro']
+    yield dict(progresso)
+
+
+def organizar(pasta_origem, criterio, operacao, recursivo=False, **opcoes):
+    """Planeja e executa de uma vez; retorna o progresso final"""
+    progresso = None
+    for progresso in executar(planejar(pasta_origem, criterio, recursivo), operacao, **opcoes):
+        pass
+    return progresso
@@ -0,0 +1,123 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from duplicados import desfazer_link
+from organizador import TRABALHADORES, mover
+
+
+def _restaurar_pasta(pasta_origem, pasta_destino, nomes):
+    """Devolve os arquivos de uma pasta de destino listando cada pasta uma vez só
+
+    Arquivos que não estão mais no destino ou que já têm outro com o mesmo nome na origem
+    ficam onde estão. Retorna (restaurados, ignorados).
+    """
+    try:
+        presentes = set(os.listdir(pasta_destino))
+    except FileNotFoundError:
+        return 0, len(nomes)
+    os.makedirs(pasta_origem, exist_ok=True)
+    ocupados = set(os.listdir(pasta_origem))
+
+    restaurados = 0
+    for nome in nomes:
+        if nome in presentes and nome not in ocupados:
+            try:
+                mover(os.path.join(pasta_destino, nome), os.path.join(pasta_origem, nome))
+            except FileExistsError:
+                # Criado na origem depois da listagem
+                continue
+            restaurados += 1
+    return restaurados, len(nomes) - restaurados
+
+
+def _restaurar_grupos(grupos, trabalhadores):
+    """Restaura em paralelo um conjunto de grupos (uma tarefa por par de pastas)"""
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        tarefas = [
+            executor.submit(_restaurar_pasta, pasta_origem, pasta_destino, nomes)
+            for (pasta_origem, pasta_destino), nomes in grupos.items()
+        ]
+        resultados = [tarefa.result() for tarefa in tarefas]
+    return sum(r for r, _ in resultados), sum(i for _, i in resultados)
+
+
+def _restaurar_avulso(movimento):
+    """Desfaz um registro avulso; retorna True se algo foi restaurado"""
+    origem, destino = movimento[:2]
+    if not os.path.exists(destino):
+        return False
+    if movimento[2:] == ['link']:
+        # Duplicado trocado por link: volta a ter uma cópia própria
+        desfazer_link(origem, destino)
+        return True
+    os.makedirs(os.path.dirname(origem), exist_ok=True)
+    try:
+        mover(destino, origem)
+    except FileExistsError:
+        return False
+    return True
+
+
+def _remover_pastas_vazias(pastas, raiz):
+    """Apaga as pastas que ficaram vazias (e as mães vazias até a raiz da operação)"""
+    raiz = os.path.abspath(raiz)
+    candidatas = set()
+    for pasta in pastas:
+        pasta = os.path.abspath(pasta)
+        while pasta != raiz and pasta.startswith(raiz + os.sep):
+            candidatas.add(pasta)
+            pasta = os.path.dirname(pasta)
+
+    # Das mais fundas para as mais rasas; rmdir falha sozinho se a pasta não estiver vazia
+    for pasta in sorted(candidatas, key=lambda p: p.count(os.sep), reverse=True):
+        try:
+            os.rmdir(pasta)
+        except OSError:
+            pass
+
+
+def reverter_operacao(diario, numero, trabalhadores=TRABALHADORES):
+    """Reverte uma operação do diário pasta a pasta; retorna (restaurados, ignorados)"""
+    cabecalho = diario.cabecalho(numero)
+    restaurados = ignorados = 0
+    pastas_destino = set()
+
+    # Linhas da mais nova para a mais antiga; grupos seguidos são restaurados juntos, em paralelo
+    grupos = defaultdict(list)
+    for registro in reversed(list(diario.registros(numero))):
+        if 'nomes' in registro:
+            grupos[(registro['de'], registro['para'])].extend(registro['nomes'])
+            pastas_destino.add(registro['para'])
+            continue
+
+        if grupos:
+            feitos, pulados = _restaurar_grupos(grupos, trabalhadores)
+            restaurados, ignorados = restaurados + feitos, ignorados + pulados
+            grupos = defaultdict(list)
+        for movimento in reversed(registro['movimentos']):
+            if _restaurar_avulso(movimento):
+                restaurados += 1
+            else:
+                ignorados += 1
+            if movimento[2:] != ['link']:
+                pastas_destino.add(os.path.dirname(movimento[1]))
+
+    if grupos:
+        feitos, pulados = _restaurar_grupos(grupos, trabalhadores)
+        restaurados, ignorados = restaurados + feitos, ignorados + pulados
+
+    _remover_pastas_vazias(pastas_destino, cabecalho['pasta'])
+    diario.marcar_revertida(numero)
+    return restaurados, ignorados
+
+
+def reverter_ate(diario, numero, trabalhadores=TRABALHADORES):
+    """Reverte, da mais nova para a mais antiga, todas as operações ativas a partir de `numero`"""
+    restaurados = ignorados = 0
+    ultima = diario.ultima_ativa()
+    while ultima is not None and ultima >= numero:
+        feitos, pulados = reverter_operacao(diario, ultima, trabalhadores)
+        restaurados, ignorados = restaurados + feitos, ignorados + pulados
+        ultima = diario.ultima_ativa()
+    return restaurados, ignorados
@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import app
+
+# Um lote fecha quando chega a este tamanho ou quando a primeira pergunta espera este tempo
+TAMANHO_LOTE = 256
+ESPERA_LOTE = 0.002
+
+# Perguntas aguardando lote; com a fila cheia o servidor responde 503 em vez de acumular
+TAMANHO_FILA = 4096
+
+# Maior k aceito por pergunta; o lote busca com o maior k entre as perguntas dele
+K_MAX = 50
+
+STATUS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+
+class Servidor:
+    """Servidor HTTP do assistente: junta as perguntas simultâneas em lotes"""
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE, espera_lote=ESPERA_LOTE, tamanho_fila=TAMANHO_FILA):
+        self.tamanho_lote = tamanho_lote
+        self.espera_lote = espera_lote
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+        self.lotes = 0
+        self.recusadas = 0
+
+    async def perguntar(self, pergunta, k=1):
+        """Coloca a pergunta na fila e espera a resposta do lote; None se a fila está cheia"""
+        futuro = asyncio.get_running_loop().create_future()
+        try:
+            self.fila.put_nowait((pergunta, k, futuro))
+        except asyncio.QueueFull:
+            self.recusadas += 1
+            return None
+        return await futuro
+
+    async def processar_lotes(self):
+        """Consome a fila respondendo cada lote com uma única busca no índice"""
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self.fila.get()]
+            limite = loop.time() + self.espera_lote
+            while len(lote) < self.tamanho_lote:
+                try:
+                    lote.append(self.fila.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self.fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            perguntas = [pergunta for pergunta, _, _ in lote]
+            k = max(k for _, k, _ in lote)
+            try:
+                # A busca roda fora do loop de eventos para as conexões seguirem sendo aceitas
+                respostas = await asyncio.to_thread(app.responder_perguntas_lote, perguntas, k)
+            except Exception as erro:
+                print(f"Erro ao responder um lote de {len(lote)} perguntas: {erro!r}")
+                for _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(erro)
+                continue
+
+            self.lotes += 1
+            for (_, k_pergunta, futuro), resposta in zip(lote, respostas):
+                if not futuro.done():
+                    futuro.set_result(resposta[:k_pergunta])
+
+    async def atender(self, leitor, escritor):
+        """Trata as requisições HTTP/1.1 de uma conexão (com keep-alive)"""
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                try:
+                    metodo, alvo, _ = linha.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._enviar(escritor, 400, {'erro': 'requisição inválida'}, fechar=True)
+                    break
+
+                cabecalhos = {}
+                while True:
+                    linha = await leitor.readline()
+                    if linha in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = linha.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                try:
+                    tamanho = int(cabecalhos.get('content-length', 0) or 0)
+                except ValueError:
+                    tamanho = -1
+                if tamanho < 0:
+                    await self._enviar(escritor, 400, {'erro': 'Content-Length inválido'}, fechar=True)
+                    break
+                corpo = await leitor.readexactly(tamanho)
+                fechar = cabecalhos.get('connection', '').lower() == 'close'
+
+                status, dados = await self._rotear(metodo, alvo, corpo)
+                await self._enviar(escritor, status, dados, fechar)
+                if fechar:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _rotear(self, metodo, alvo, corpo):
+        """Resolve uma requisição e devolve (status, dados em JSON)"""
+        url = urlsplit(alvo)
+        if url.path == '/status':
+            return 200, {
+                'fila': self.fila.qsize(),
+                'lotes': self.lotes,
+                'recusadas': self.recusadas,
+                'cache': app.cache.estatisticas(),
+            }
+        if url.path != '/perguntar':
+            return 404, {'erro': 'rota não encontrada'}
+
+        if metodo == 'GET':
+            parametros = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+        elif metodo == 'POST':
+            try:
+                parametros = json.loads(corpo or b'{}')
+            except ValueError:
+                return 400, {'erro': 'JSON inválido'}
+        else:
+            return 405, {'erro': 'use GET ou POST'}
+
+        pergunta = parametros.get('pergunta')
+        try:
+            k = int(parametros.get('k', 1))
+        except (TypeError, ValueError):
+            k = 0
+        if not isinstance(pergunta, str) or not pergunta.strip() or k < 1:
+            return 400, {'erro': "informe 'pergunta' e 'k' >= 1"}
+        # Mais respostas do que o FAQ tem não muda nada e um k enorme estouraria a memória do lote
+        k = max(min(k, len(app.indice), K_MAX), 1)
+
+        try:
+            respostas = await self.perguntar(pergunta, k)
+        except Exception:
+            # O lote inteiro falhou: cada pergunta dele recebe 500 e a conexão continua
+            return 500, {'erro': 'erro interno ao buscar a resposta'}
+        if respostas is None:
+            return 503, {'erro': 'servidor ocupado, tente novamente'}
+        return 200, {
+            'pergunta': pergunta,
+            'respostas': [{'resposta': resposta, 'score': score} for resposta, score in respostas],
+        }
+
+    async def _enviar(self, escritor, status, dados, fechar=False):
+        """Escreve a resposta HTTP com corpo JSON"""
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        cabecalhos = [
+            f"HTTP/1.1 {status} {STATUS[status]}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(corpo)}",
+            f"Connection: {'close' if fechar else 'keep-alive'}",
+        ]
+        if status == 503:
+            cabecalhos.append("Retry-After: 1")
+        escritor.write(("\r\n".join(cabecalhos) + "\r\n\r\n").encode('latin-1') + corpo)
+        await escritor.drain()
+
+
+async def servir(host='127.0.0.1', porta=8000, **opcoes):
+    """Sobe o servidor HTTP e o consumidor de lotes"""
+    servidor = Servidor(**opcoes)
+    consumidor = asyncio.create_task(servidor.processar_lotes())
+    conexoes = await asyncio.start_server(servidor.atender, host, porta)
+    print(f"Assistente Virtual em http://{host}:{porta}/perguntar?pergunta=...")
+    try:
+        async with conexoes:
+            await conexoes.serve_forever()
+    finally:
+        consumidor.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor HTTP do Assistente Virtual")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE)
+    parser.add_argument('--tamanho-fila', type=int, default=TAMANHO_FILA)
+    args = parser.parse_args()
+    asyncio.run(servir(args.host, args.porta, tamanho_lote=args.tamanho_lote, tamanho_fila=args.tamanho_fila))
@@ -0,0 +1,56 @@
+import numpy as np
+import streamlit as st
+
+# Linhas enviadas ao navegador por página
+LINHAS_POR_PAGINA = 50
+
+
+def ordenar_posicoes(df, colunas):
+    """Pré-calcula as posições das linhas de df em ordem crescente de cada coluna (vazios no fim)
+
+    Retorna {coluna: (posicoes, n_preenchidas)}; a ordem decrescente sai invertendo as preenchidas.
+    """
+    ordens = {}
+    for coluna in colunas:
+        serie = df[coluna].reset_index(drop=True)
+        posicoes = serie.sort_values(kind='stable', na_position='last').index.to_numpy()
+        ordens[coluna] = (posicoes, int(serie.notna().sum()))
+    return ordens
+
+
+def linhas_ordenadas(ordem, selecionadas, decrescente=False):
+    """Posições selecionadas (máscara booleana sobre df) na ordem pré-calculada, sem ordenar de novo"""
+    posicoes, n_preenchidas = ordem
+    if decrescente:
+        posicoes = np.concatenate([posicoes[:n_preenchidas][::-1], posicoes[n_preenchidas:]])
+    return posicoes[selecionadas[posicoes]]
+
+
+def tabela_paginada(df, df_filtrado, ordens, chave, coluna=None, decrescente=True,
+                    linhas_por_pagina=LINHAS_POR_PAGINA, **opcoes):
+    """Mostra df_filtrado página a página; só as linhas da página vão para o navegador"""
+    colunas = list(ordens)
+    col1, col2, col3 = st.columns([3, 1, 1])
+    coluna = col1.selectbox(
+        "Ordenar por", colunas,
+        index=colunas.index(coluna) if coluna in colunas else 0,
+        key=f"{chave}_coluna"
+    )
+    decrescente = col2.toggle("Decrescente", value=decrescente, key=f"{chave}_decrescente")
+
+    selecionadas = np.zeros(len(df), dtype=bool)
+    selecionadas[df.index.get_indexer(df_filtrado.index)] = True
+    linhas = linhas_ordenadas(ordens[coluna], selecionadas, decrescente)
+
+    n_paginas = max(-(-len(linhas) // linhas_por_pagina), 1)
+    # Filtro mais restrito que a página guardada: volta para a última página que existe
+    if st.session_state.get(f"{chave}_pagina", 1) > n_paginas:
+        st.session_state[f"{chave}_pagina"] = n_paginas
+    pagina = col3.number_input("Página", min_value=1, max_value=n_paginas, step=1, key=f"{chave}_pagina")
+
+    inicio = (pagina - 1) * linhas_por_pagina
+    st.dataframe(df.iloc[linhas[inicio:inicio + linhas_por_pagina]], **opcoes)
+    st.caption(
+        f"Linhas {min(inicio + 1, len(linhas))}–{min(inicio + linhas_por_pagina, len(linhas))} "
+        f"de {len(linhas)} ({n_paginas} páginas)"
+    )
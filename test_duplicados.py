@@ -0,0 +1,33 @@
+import os
+
+from diario import Diario
+from duplicados import encontrar_duplicados, tratar_duplicados
+
+
+def _tratar(pasta, diario):
+    with diario.iniciar('extensao', str(pasta)) as operacao:
+        n = tratar_duplicados(str(pasta), operacao, 'link')
+    return n, list(diario.movimentos(diario.ultima_ativa()))
+
+
+def test_link_duas_vezes_na_mesma_pasta(tmp_path):
+    pasta = tmp_path / "pasta"
+    pasta.mkdir()
+    (pasta / "a.txt").write_text("mesmo conteúdo")
+    (pasta / "b.txt").write_text("mesmo conteúdo")
+    os.utime(pasta / "b.txt", (2_000_000_000, 2_000_000_000))
+    diario = Diario(str(tmp_path / "diario.jsonl"), str(tmp_path / "diario.idx"))
+
+    n, movimentos = _tratar(pasta, diario)
+    assert n == 1
+    assert movimentos == [[str(pasta / "b.txt"), str(pasta / "a.txt"), 'link']]
+    assert os.path.samefile(pasta / "a.txt", pasta / "b.txt")
+
+    # Já são hard links: nada a ler, reportar ou registrar de novo
+    assert encontrar_duplicados(str(pasta)) == []
+    for _ in range(2):
+        n, _ = _tratar(pasta, diario)
+        assert n == 0
+    assert sorted(os.listdir(pasta)) == ["a.txt", "b.txt"]
+    assert os.path.samefile(pasta / "a.txt", pasta / "b.txt")
+    diario.fechar()
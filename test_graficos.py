@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+from graficos import caixas_por_quantis, dispersao_adaptativa
+
+
+def test_caixas_sem_linhas_gera_grafico_vazio():
+    df = pd.DataFrame({'Tipo': pd.Series([], dtype=str), 'Dias': pd.Series([], dtype=float)})
+    fig = caixas_por_quantis(df, 'Tipo', 'Dias', color='Tipo', title='Tempo', labels={'Dias': 'Dias'})
+    assert len(fig.data) == 0
+    assert fig.layout.title.text == 'Tempo'
+    assert fig.layout.yaxis.title.text == 'Dias'
+
+
+def test_dispersao_amostrada_ignora_pontos_sem_y():
+    n = 10000
+    df = pd.DataFrame({'x': np.arange(n), 'y': np.where(np.arange(n) % 2, np.nan, np.sin(np.arange(n)))})
+    fig = dispersao_adaptativa(df, 'x', 'y', limite=1000)
+    assert not np.isnan(np.asarray(fig.data[0].y, dtype=float)).any()
+    assert len(fig.data[0].y) == 1000
@@ -0,0 +1,13 @@
+from cubo import fatiar_cubo, totais
+from metricas import VISOES, atualizar_metricas
+
+
+def test_base_vazia_gera_cubo_com_medidas(tmp_path, monkeypatch):
+    # Sem nenhuma parte ingerida ainda (primeira execução dos dashboards)
+    monkeypatch.chdir(tmp_path)
+    for visao in VISOES:
+        cubo = atualizar_metricas(visao)
+        assert cubo.empty
+        metricas = totais(fatiar_cubo(cubo, {'Tipo de Documento': []}))
+        assert metricas['quantidade'] == 0
+        assert metricas['receita'] == 0
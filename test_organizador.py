@@ -0,0 +1,35 @@
+from organizador import executar, organizar, planejar
+
+
+class _Operacao:
+    def __init__(self):
+        self.movimentos = []
+
+    def registrar(self, origem, destino, acao=None):
+        self.movimentos.append([origem, destino])
+
+
+def test_destino_criado_depois_do_plano_nao_e_sobrescrito(tmp_path):
+    (tmp_path / "a.pdf").write_text("novo")
+    plano = list(planejar(str(tmp_path), 'extensao'))
+    assert not plano[0].conflito
+
+    # Chega um arquivo com o mesmo nome no destino entre o plano e a execução
+    (tmp_path / "PDF").mkdir()
+    (tmp_path / "PDF" / "a.pdf").write_text("existente")
+    operacao = _Operacao()
+    *_, progresso = executar(plano, operacao)
+
+    assert progresso['movidos'] == 0 and progresso['pulados'] == 1
+    assert operacao.movimentos == []
+    assert (tmp_path / "PDF" / "a.pdf").read_text() == "existente"
+    assert (tmp_path / "a.pdf").read_text() == "novo"
+
+
+def test_substituir_sobrescreve(tmp_path):
+    (tmp_path / "a.pdf").write_text("novo")
+    (tmp_path / "PDF").mkdir()
+    (tmp_path / "PDF" / "a.pdf").write_text("existente")
+    progresso = organizar(str(tmp_path), 'extensao', _Operacao(), substituir=True)
+    assert progresso['movidos'] == 1
+    assert (tmp_path / "PDF" / "a.pdf").read_text() == "novo"
@@ -0,0 +1,204 @@
+import argparse
+import ctypes
+import ctypes.util
+import itertools
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+from diario import Diario
+from organizador import REGRAS, executar, planejar
+
+# Tempo sem arquivos novos que fecha um lote (segundos) e tamanho que fecha o lote mesmo com a rajada em curso
+ESPERA_LOTE = 2.0
+LOTE_MAXIMO = 10000
+
+# Intervalo entre varreduras quando não há inotify (Windows, macOS, sistemas de arquivos de rede)
+INTERVALO_POLLING = 5.0
+
+# Eventos do inotify: arquivo fechado depois de escrito ou movido para dentro da pasta
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_ISDIR = 0x40000000
+# Fila do kernel cheia: eventos foram perdidos e a pasta precisa ser varrida de novo
+IN_Q_OVERFLOW = 0x00004000
+EVENTO = struct.Struct('iIII')
+
+
+def arquivos_da_pasta(pasta):
+    """Nomes de todos os arquivos no primeiro nível da pasta"""
+    with os.scandir(pasta) as entradas:
+        return {entrada.name for entrada in entradas if entrada.is_file()}
+
+
+class FonteInotify:
+    """Avisa dos arquivos prontos na pasta via inotify (Linux); bloqueia sem gastar CPU"""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0 or libc.inotify_add_watch(self.fd, os.fsencode(pasta), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            raise OSError(ctypes.get_errno(), "inotify indisponível")
+
+    def esperar(self, timeout):
+        """Nomes dos arquivos que ficaram prontos; conjunto vazio se o tempo acabou
+
+        Se a fila do inotify transbordou, devolve todos os arquivos da pasta (varredura completa).
+        """
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return set()
+        dados = os.read(self.fd, 64 * 1024)
+        nomes = set()
+        transbordou = False
+        posicao = 0
+        while posicao < len(dados):
+            _, mascara, _, tamanho = EVENTO.unpack_from(dados, posicao)
+            posicao += EVENTO.size
+            transbordou = transbordou or bool(mascara & IN_Q_OVERFLOW)
+            nome = dados[posicao:posicao + tamanho].rstrip(b'\0')
+            posicao += tamanho
+            if nome and not mascara & IN_ISDIR:
+                nomes.add(os.fsdecode(nome))
+        if transbordou:
+            # O planejar do lote reorganiza tudo o que ficou na pasta, inclusive os eventos perdidos
+            nomes |= arquivos_da_pasta(self.pasta)
+        return nomes
+
+    def fechar(self):
+        os.close(self.fd)
+
+
+class FontePolling:
+    """Alternativa ao inotify: varre a pasta e avisa dos arquivos com tamanho/data estáveis"""
+
+    def __init__(self, pasta, intervalo=INTERVALO_POLLING):
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.anteriores = {}
+        self.avisados = {}
+        self.ultima_varredura = 0.0
+
+    def _assinaturas(self):
+        with os.scandir(self.pasta) as entradas:
+            return {
+                entrada.name: (entrada.stat().st_size, entrada.stat().st_mtime_ns)
+                for entrada in entradas if entrada.is_file()
+            }
+
+    def esperar(self, timeout):
+        """Nomes dos arquivos que ficaram prontos; conjunto vazio se o tempo acabou antes da varredura"""
+        falta = self.ultima_varredura + self.intervalo - time.monotonic()
+        if timeout is not None and timeout < falta:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(falta, 0))
+        self.ultima_varredura = time.monotonic()
+        atuais = self._assinaturas()
+        # Pronto = igual à varredura anterior (não está mais sendo escrito) e ainda não avisado assim
+        nomes = {
+            nome for nome, assinatura in atuais.items()
+            if self.anteriores.get(nome) == assinatura and self.avisados.get(nome) != assinatura
+        }
+        self.avisados = {nome: atuais[nome] for nome in self.avisados.keys() & atuais.keys()}
+        self.avisados.update((nome, atuais[nome]) for nome in nomes)
+        self.anteriores = atuais
+        return nomes
+
+    def fechar(self):
+        pass
+
+
+def organizar_lote(pasta, criterio, nomes, diario):
+    """Organiza só os arquivos do lote, numa operação do diário; retorna o progresso ou None"""
+    conflitos = 0
+
+    def plano_do_lote():
+        nonlocal conflitos
+        for movimento in planejar(pasta, criterio):
+            if os.path.basename(movimento.origem) not in nomes:
+                continue
+            if movimento.conflito:
+                conflitos += 1
+                continue
+            yield movimento
+
+    # Lote sem nada para mover não vira operação vazia no diário
+    plano = plano_do_lote()
+    primeiro = next(plano, None)
+    if primeiro is None:
+        return None
+    with diario.iniciar(criterio, pasta) as operacao:
+        for progresso in executar(itertools.chain([primeiro], plano), operacao):
+            pass
+    progresso['pulados'] += conflitos
+    return progresso
+
+
+def vigiar(pasta, criterio='extensao', espera=ESPERA_LOTE, polling=False, parar=None, diario=None):
+    """Organiza continuamente os arquivos que chegam à pasta, em lotes"""
+    if parar is None:
+        parar = threading.Event()
+    if diario is None:
+        diario = Diario()
+    fonte = None
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            fonte = FonteInotify(pasta)
+        except OSError:
+            fonte = None
+    fonte = fonte or FontePolling(pasta)
+
+    # O que já estava na pasta entra no primeiro lote
+    pendentes = arquivos_da_pasta(pasta)
+    ultimo_evento = time.monotonic() - espera
+
+    try:
+        while not parar.is_set():
+            # Sem pendências espera em blocos de 1 s só para poder checar `parar`
+            restante = espera - (time.monotonic() - ultimo_evento) if pendentes else 1.0
+            nomes = fonte.esperar(max(restante, 0))
+            if nomes:
+                pendentes |= nomes
+                ultimo_evento = time.monotonic()
+                if len(pendentes) < LOTE_MAXIMO:
+                    continue
+            if not pendentes or (len(pendentes) < LOTE_MAXIMO and time.monotonic() - ultimo_evento < espera):
+                continue
+
+            lote, pendentes = pendentes, set()
+            try:
+                progresso = organizar_lote(pasta, criterio, lote, diario)
+            except OSError as erro:
+                # Arquivo travado (ex: ainda aberto no Windows): tenta de novo no próximo lote
+                print(f"{datetime.now():%Y-%m-%d %H:%M:%S} Erro ao organizar: {erro}")
+                pendentes |= lote
+                ultimo_evento = time.monotonic()
+                continue
+            if progresso:
+                print(
+                    f"{datetime.now():%Y-%m-%d %H:%M:%S} {progresso['movidos']} arquivos organizados"
+                    + (f", {progresso['pulados']} já existiam no destino" if progresso['pulados'] else "")
+                )
+    finally:
+        fonte.fechar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Organiza automaticamente os arquivos que chegam a uma pasta")
+    parser.add_argument('pasta')
+    parser.add_argument('--criterio', choices=list(REGRAS), default='extensao')
+    parser.add_argument('--espera', type=float, default=ESPERA_LOTE, help="segundos sem arquivos novos para fechar um lote")
+    parser.add_argument('--polling', action='store_true', help="varre a pasta periodicamente em vez de usar inotify")
+    args = parser.parse_args()
+
+    print(f"Vigiando {args.pasta} (Ctrl+C para sair)")
+    try:
+        vigiar(args.pasta, args.criterio, args.espera, args.polling)
+    except KeyboardInterrupt:
+        pass